@@ -0,0 +1,24 @@
+"""add holiday date index
+
+Revision ID: 2e7c5a90f1b3
+Revises: 8d2f41c6ab97
+Create Date: 2026-10-18 11:41:52.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e7c5a90f1b3'
+down_revision = '8d2f41c6ab97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_holiday_date', 'holiday', ['date'])
+
+
+def downgrade():
+    op.drop_index('ix_holiday_date', table_name='holiday')
@@ -0,0 +1,31 @@
+"""add patient search indexes
+
+Revision ID: 4c8e2d6f1a93
+Revises: e91a3f0b7c25
+Create Date: 2026-10-18 15:02:41.318027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e2d6f1a93'
+down_revision = 'e91a3f0b7c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Выражения совпадают с Patient.search_name и Patient.search_mobile
+    op.execute("CREATE INDEX ix_patient_name_trgm ON patient USING gin "
+               "(lower(coalesce(last_name, '') || ' ' || coalesce(first_name, '') || ' ' || "
+               "coalesce(middle_name, '')) gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_patient_mobile_digits_trgm ON patient USING gin "
+               "(regexp_replace(coalesce(mobile, ''), '[^0-9]', '', 'g') gin_trgm_ops)")
+
+
+def downgrade():
+    op.drop_index('ix_patient_mobile_digits_trgm', table_name='patient')
+    op.drop_index('ix_patient_name_trgm', table_name='patient')
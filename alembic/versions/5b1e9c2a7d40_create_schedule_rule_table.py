@@ -0,0 +1,42 @@
+"""create schedule rule table
+
+Revision ID: 5b1e9c2a7d40
+Revises: ac051ac98781
+Create Date: 2026-10-18 10:12:41.305114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e9c2a7d40'
+down_revision = 'ac051ac98781'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблица правила расписания врачей
+    op.create_table(
+        'schedule_rule',
+        sa.Column('id', sa.Integer, unique=True, nullable=False, primary_key=True),
+        sa.Column('created', sa.TIMESTAMP, server_default=sa.func.now()),
+        sa.Column('modified', sa.TIMESTAMP, server_default=sa.func.now()),
+        sa.Column('doctor_id', sa.Integer, sa.ForeignKey('doctor.id'), nullable=False),
+        sa.Column('creator_id', sa.Integer, sa.ForeignKey('user.id'), nullable=True),
+        sa.Column('weekdays', sa.Integer, nullable=False),
+        sa.Column('time_start', sa.Time, nullable=False),
+        sa.Column('time_end', sa.Time, nullable=False),
+        sa.Column('interval', sa.Integer, nullable=False),
+        sa.Column('date_from', sa.Date, nullable=False),
+        sa.Column('date_to', sa.Date, nullable=False),
+        sa.Column('exceptions', postgresql.ARRAY(sa.Date), nullable=True),
+    )
+    op.create_index('ix_schedule_rule_doctor_period', 'schedule_rule', ['doctor_id', 'date_from', 'date_to'])
+
+
+def downgrade():
+    op.drop_index('ix_schedule_rule_doctor_period', table_name='schedule_rule')
+    op.drop_table('schedule_rule')
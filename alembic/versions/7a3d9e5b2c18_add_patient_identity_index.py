@@ -0,0 +1,42 @@
+"""add patient identity index
+
+Revision ID: 7a3d9e5b2c18
+Revises: 4c8e2d6f1a93
+Create Date: 2026-10-18 16:11:27.604319
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3d9e5b2c18'
+down_revision = '4c8e2d6f1a93'
+branch_labels = None
+depends_on = None
+
+IDENTITY = ("(lower(btrim(coalesce(last_name, '')))), (lower(btrim(coalesce(first_name, '')))), "
+            "(lower(btrim(coalesce(middle_name, '')))), (regexp_replace(coalesce(mobile, ''), '[^0-9]', '', 'g'))")
+
+
+def upgrade():
+    # Дубликаты объединяются здесь одним проходом: визиты переносятся на пациента с наименьшим id,
+    # иначе уникальный индекс не создать. После индекса новые дубликаты не появляются
+    op.execute("""
+        CREATE TEMPORARY TABLE patient_merge ON COMMIT DROP AS
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY {identity}) AS keep_id FROM patient
+        ) ranked
+        WHERE id <> keep_id
+    """.format(identity=IDENTITY))
+    op.execute("""
+        UPDATE visit SET patient_id = patient_merge.keep_id
+        FROM patient_merge
+        WHERE visit.patient_id = patient_merge.id
+    """)
+    op.execute("DELETE FROM patient USING patient_merge WHERE patient.id = patient_merge.id")
+    op.execute("CREATE UNIQUE INDEX ux_patient_identity ON patient ({identity})".format(identity=IDENTITY))
+
+
+def downgrade():
+    op.drop_index('ux_patient_identity', table_name='patient')
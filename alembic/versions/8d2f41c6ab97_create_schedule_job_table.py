@@ -0,0 +1,40 @@
+"""create schedule job table
+
+Revision ID: 8d2f41c6ab97
+Revises: 5b1e9c2a7d40
+Create Date: 2026-10-18 11:04:17.550231
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f41c6ab97'
+down_revision = '5b1e9c2a7d40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблица фоновых задач формирования расписания
+    op.create_table(
+        'schedule_job',
+        sa.Column('id', sa.Integer, unique=True, nullable=False, primary_key=True),
+        sa.Column('created', sa.TIMESTAMP, server_default=sa.func.now()),
+        sa.Column('modified', sa.TIMESTAMP, server_default=sa.func.now()),
+        sa.Column('doctor_id', sa.Integer, sa.ForeignKey('doctor.id'), nullable=False),
+        sa.Column('creator_id', sa.Integer, sa.ForeignKey('user.id'), nullable=True),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('params', postgresql.JSONB, nullable=False),
+        sa.Column('total', sa.Integer, nullable=True),
+        sa.Column('count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('error', sa.String(500), nullable=True),
+        sa.Column('started', sa.TIMESTAMP, nullable=True),
+        sa.Column('finished', sa.TIMESTAMP, nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('schedule_job')
@@ -0,0 +1,27 @@
+"""add doctor color and visit comment
+
+Revision ID: 9c4b1f7e2a60
+Revises: 7a3d9e5b2c18
+Create Date: 2026-10-18 19:02:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4b1f7e2a60'
+down_revision = '7a3d9e5b2c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Столбцы моделей, которых не было в миграциях; в базах, созданных через create_all, они уже есть
+    op.execute('ALTER TABLE doctor ADD COLUMN IF NOT EXISTS color VARCHAR(30)')
+    op.execute('ALTER TABLE visit ADD COLUMN IF NOT EXISTS comment VARCHAR(500)')
+
+
+def downgrade():
+    op.drop_column('visit', 'comment')
+    op.drop_column('doctor', 'color')
@@ -0,0 +1,29 @@
+"""add schedule availability indexes
+
+Revision ID: b43d7e18c6a2
+Revises: 2e7c5a90f1b3
+Create Date: 2026-10-18 12:20:06.874512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b43d7e18c6a2'
+down_revision = '2e7c5a90f1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Свободные интервалы: (doctor_id, date_start) и покрываемые столбцы запроса для index-only scan
+    op.create_index('ix_schedule_doctor_free', 'schedule', ['doctor_id', 'date_start', 'date_end', 'id'],
+                    postgresql_where=sa.text('NOT is_busy'))
+    op.create_index('ix_schedule_doctor_busy', 'schedule', ['doctor_id', 'date_start'],
+                    postgresql_where=sa.text('is_busy'))
+
+
+def downgrade():
+    op.drop_index('ix_schedule_doctor_busy', table_name='schedule')
+    op.drop_index('ix_schedule_doctor_free', table_name='schedule')
@@ -0,0 +1,39 @@
+"""create schedule day table
+
+Revision ID: e91a3f0b7c25
+Revises: b43d7e18c6a2
+Create Date: 2026-10-18 13:02:44.690217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91a3f0b7c25'
+down_revision = 'b43d7e18c6a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Сводка свободных интервалов врачей по дням
+    op.create_table(
+        'schedule_day',
+        sa.Column('created', sa.TIMESTAMP, server_default=sa.func.now()),
+        sa.Column('modified', sa.TIMESTAMP, server_default=sa.func.now()),
+        sa.Column('doctor_id', sa.Integer, sa.ForeignKey('doctor.id'), primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('free', sa.Integer, nullable=False, server_default='0'),
+    )
+    op.execute("""
+        INSERT INTO schedule_day (doctor_id, day, free)
+        SELECT doctor_id, date_start::date, count(*)
+        FROM schedule
+        WHERE NOT is_busy AND doctor_id IS NOT NULL
+        GROUP BY doctor_id, date_start::date
+    """)
+
+
+def downgrade():
+    op.drop_table('schedule_day')
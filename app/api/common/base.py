@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
 import falcon
-import json
+import datetime
+import operator
+
+from sqlalchemy.orm import Session
 
 try:
     from collections import OrderedDict
@@ -9,13 +12,32 @@ except ImportError:
     OrderedDict = dict
 
 from app import log
-from app.utils.alchemy import new_alchemy_encoder
+from app.utils import encoder
+from app.utils.alchemy import to_primitive
 from app.config import BRAND_NAME, POSTGRES
 from app.database import engine
-from app.errors import NotSupportedError
+from app.errors import NotSupportedError, InvalidParameterError
+from app.model.base import compile_serializer
 
 LOG = log.get_logger()
 
+# Количество строк, читаемых с серверного курсора и кодируемых за один шаг потоковой выдачи
+STREAM_CHUNK_SIZE = 1000
+
+# Размер страницы списка по умолчанию и наибольший допустимый
+PAGE_LIMIT = 100
+PAGE_LIMIT_MAX = 1000
+
+# Операторы фильтров списка вида ?field__gte=value
+FILTER_OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+}
+
 
 class BaseResource(object):
     HELLO_WORLD = {
@@ -23,11 +45,12 @@ class BaseResource(object):
         'database': '%s (%s)' % (engine.name, POSTGRES['host'])
     }
 
+    # Ответ кодируется сразу в байты для res.data
     def to_json(self, body_dict):
-        return json.dumps(body_dict)
+        return encoder.dumps(body_dict)
 
-    def from_db_to_json(self, db):
-        return json.dumps(db, cls=new_alchemy_encoder())
+    def from_db_to_json(self, db, depth=1, fields=None):
+        return self.to_json(to_primitive(db, depth, fields))
 
     def on_error(self, res, error=None):
         res.status = error['status']
@@ -37,23 +60,133 @@ class BaseResource(object):
 
         obj = OrderedDict()
         obj['meta'] = meta
-        res.body = self.to_json(obj)
+        res.data = self.to_json(obj)
 
-    def on_success(self, res, data=None):
-        res.status = falcon.HTTP_200
+    def success_meta(self, paging=None):
         meta = OrderedDict()
         meta['code'] = 200
         meta['message'] = 'OK'
+        if paging is not None:
+            meta['paging'] = paging
+        return meta
 
+    def on_success(self, res, data=None, paging=None):
+        res.status = falcon.HTTP_200
         obj = OrderedDict()
-        obj['meta'] = meta
+        obj['meta'] = self.success_meta(paging)
         obj['data'] = data
-        res.body = self.to_json(obj)
+        res.data = self.to_json(obj)
+
+    # Ответ с данными, уже закодированными в JSON
+    def on_success_encoded(self, res, data, paging=None):
+        res.status = falcon.HTTP_200
+        res.data = b'{"meta":' + self.to_json(self.success_meta(paging)) + b',"data":' + data + b'}'
+
+    # Страница списка: ключевая пагинация по первичному ключу (?limit=, ?after=),
+    # выбор полей (?fields=id,name), фильтры (?name=, ?id__gte=, ?id__in=1,2)
+    # и общее количество по требованию (?count=true).
+    # fields - поля, доступные клиенту для выбора и фильтров (по умолчанию поля to_dict)
+    def collection(self, req, session, model, options=(), serialize=None, fields=None):
+        fields = model.serialized_fields() if fields is None else tuple(fields)
+        pk = model.get_id()
+        query = session.query(model).filter(*self.collection_filters(req, model, fields))
+
+        paging = OrderedDict()
+        if req.get_param_as_bool('count'):
+            paging['total'] = query.order_by(None).count()
+
+        limit = req.get_param_as_int('limit', min=1, max=PAGE_LIMIT_MAX) or PAGE_LIMIT
+        after = req.get_param('after')
+        if after is not None:
+            query = query.filter(pk > self.filter_value(pk, after))
+
+        selected = req.get_param_as_list('fields')
+        if selected:
+            unknown = set(selected) - set(fields)
+            if unknown:
+                raise InvalidParameterError('fields: %s' % ', '.join(sorted(unknown)))
+            keys = tuple(OrderedDict.fromkeys([pk.key] + selected))
+            query = query.with_entities(*[getattr(model, key) for key in keys])
+            serialize = compile_serializer(model, keys)
+        else:
+            query = query.options(*options)
+
+        rows = query.order_by(pk).limit(limit + 1).all()
+        paging['limit'] = limit
+        paging['next'] = getattr(rows[limit - 1], pk.key) if len(rows) > limit else None
+        rows = rows[:limit]
+        items = list(map(serialize, rows)) if serialize else model.to_dict_list(rows)
+        return items, paging
+
+    def collection_filters(self, req, model, fields):
+        criteria = []
+        for param, value in req.params.items():
+            name, _, op = param.partition('__')
+            if name not in fields:
+                continue
+            column = getattr(model, name)
+            if op == 'in':
+                criteria.append(column.in_([self.filter_value(column, item) for item in req.get_param_as_list(param)]))
+            elif not op or op in FILTER_OPERATORS:
+                if isinstance(value, list):
+                    value = ','.join(value)
+                criteria.append(FILTER_OPERATORS[op or 'eq'](column, self.filter_value(column, value)))
+            else:
+                raise InvalidParameterError('%s: неизвестный оператор' % param)
+        return criteria
+
+    # Значение фильтра в тип столбца; даты передаются меткой времени в секундах, как в ответах
+    @staticmethod
+    def filter_value(column, value):
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            return value
+        try:
+            if python_type is bool:
+                return value.lower() in ('true', '1', 'yes')
+            if python_type is datetime.datetime:
+                return datetime.datetime.fromtimestamp(int(value))
+            if python_type is datetime.date:
+                return datetime.date.fromtimestamp(int(value))
+            return python_type(value)
+        except (TypeError, ValueError):
+            raise InvalidParameterError('%s: %s' % (column.key, value))
+
+    # Потоковая выдача списка: строки читаются с серверного курсора и кодируются частями,
+    # build_query получает отдельную сессию, т.к. поток читается после закрытия сессии запроса
+    def on_stream(self, res, build_query, serialize, key=None, chunk_size=STREAM_CHUNK_SIZE):
+        res.status = falcon.HTTP_200
+        res.content_type = falcon.MEDIA_JSON
+        res.stream = self.stream_json(build_query, serialize, key, chunk_size)
+
+    def stream_json(self, build_query, serialize, key=None, chunk_size=STREAM_CHUNK_SIZE):
+        meta = self.success_meta()
+        session = Session(bind=engine)
+        try:
+            query = build_query(session).yield_per(chunk_size).execution_options(stream_results=True)
+            yield b'{"meta":' + self.to_json(meta) + (b',"data":{' + self.to_json(key) + b':[' if key else b',"data":[')
+            separator = b''
+            chunk = []
+            for row in query:
+                chunk.append(serialize(row))
+                if len(chunk) >= chunk_size:
+                    yield separator + self.to_json(chunk)[1:-1]
+                    separator = b','
+                    chunk = []
+            if chunk:
+                yield separator + self.to_json(chunk)[1:-1]
+            yield b']}}' if key else b']}'
+        except Exception:
+            LOG.exception('Streaming response failed')
+            raise
+        finally:
+            session.close()
 
     def on_get(self, req, res):
         if req.path == '/':
             res.status = falcon.HTTP_200
-            res.body = self.to_json(self.HELLO_WORLD)
+            res.data = self.to_json(self.HELLO_WORLD)
         else:
             raise NotSupportedError(method='GET', url=req.path)
 
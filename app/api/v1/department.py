@@ -63,12 +63,9 @@ class DepartmentCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        department_dbs = session.query(Department).all()
-        if department_dbs:
-            obj = {
-                "items": [department.to_dict() for department in department_dbs]
-            }
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, Department)
+        if items:
+            self.on_success(res, {"items": items}, paging)
         else:
             raise AppError()
 
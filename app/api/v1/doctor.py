@@ -2,6 +2,7 @@
 import falcon
 
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.exc import NoResultFound
 from cerberus import Validator
 from cerberus.errors import ValidationError
@@ -91,12 +92,9 @@ class DoctorSpecializationCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        doctor_specialization_dbs = session.query(DoctorSpecialization).all()
-        if doctor_specialization_dbs:
-            obj = {
-                "items": [doctor_specialization.to_dict() for doctor_specialization in doctor_specialization_dbs]
-            }
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, DoctorSpecialization)
+        if items:
+            self.on_success(res, {"items": items}, paging)
         else:
             raise DataNotFount()
 
@@ -170,12 +168,10 @@ class DoctorCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        doctor_dbs = session.query(Doctor).all()
-        if doctor_dbs:
-            obj = {
-                "items": [doctor.to_dict() for doctor in doctor_dbs]
-            }
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, Doctor, options=(
+            joinedload(Doctor.user), joinedload(Doctor.creator), joinedload(Doctor.specialization)))
+        if items:
+            self.on_success(res, {"items": items}, paging)
         else:
             raise DataNotFount()
 
@@ -10,6 +10,7 @@ from app import log
 from app.api.common import BaseResource
 from app.utils.hooks import auth_required
 from app.model.holiday import Holiday
+from app.utils import holidays, calendar_shedule
 from app.errors import AppError, InvalidParameterError, UserNotExistsError, DataNotFount
 from datetime import datetime
 
@@ -43,6 +44,13 @@ def validate_department_create(req, res, resource, params):
         raise InvalidParameterError('Invalid Request %s' % req.context)
 
 
+# Пересчет сводки свободных интервалов врачей за добавленные, перенесенные и удаленные праздничные дни
+def refresh_schedule_days(session, *dates):
+    holidays.invalidate()
+    for day in {date.date() for date in dates if date is not None}:
+        calendar_shedule.refresh_day(session, day)
+
+
 # Работа с коллекцией праздничные дни
 class HolidayCollection(BaseResource):
     """
@@ -59,7 +67,10 @@ class HolidayCollection(BaseResource):
             date = datetime.strptime(holiday_req['date'], "%d.%m.%Y")
             holiday = Holiday(date=date, name=name)
             session.add(holiday)
+            session.flush()
+            refresh_schedule_days(session, date)
             session.commit()
+            holidays.invalidate()
             data = {
                 "id": str(holiday.id)
             }
@@ -70,12 +81,9 @@ class HolidayCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        holiday_dbs = session.query(Holiday).all()
-        if holiday_dbs:
-            obj = {
-                "items": [holiday.to_dict() for holiday in holiday_dbs]
-            }
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, Holiday)
+        if items:
+            self.on_success(res, {"items": items}, paging)
         else:
             raise DataNotFount()
 
@@ -101,9 +109,13 @@ class HolidayItem(BaseResource):
         holiday_req = req.media
         if holiday_req:
             try:
+                date = datetime.strptime(holiday_req['date'], "%d-%m-%Y")
+                old_date = session.query(Holiday.date).filter(Holiday.id == holiday_id).scalar()
                 session.query(Holiday).filter(Holiday.id == holiday_id). \
-                    update({'name': holiday_req['name'], 'date': datetime.strptime(holiday_req['date'], "%d-%m-%Y")})
+                    update({'name': holiday_req['name'], 'date': date})
+                refresh_schedule_days(session, old_date, date)
                 session.commit()
+                holidays.invalidate()
                 self.on_success(res)
             except IntegrityError:
                 raise AppError()
@@ -114,7 +126,11 @@ class HolidayItem(BaseResource):
     def on_delete(self, req, res, holiday_id):
         session = req.context['session']
         try:
+            old_date = session.query(Holiday.date).filter(Holiday.id == holiday_id).scalar()
             session.query(Holiday).filter(Holiday.id == holiday_id).delete()
+            refresh_schedule_days(session, old_date)
+            session.commit()
+            holidays.invalidate()
             self.on_success(res)
         except NoResultFound:
             raise InvalidParameterError(req.media)
@@ -12,6 +12,9 @@ from app import log
 from app.api.common import BaseResource
 from app.utils.hooks import auth_required
 from app.model import Menu, Module
+from app.model.module import menu_has_module_table
+from app.utils.alchemy import sync_association
+from app.utils import profiles
 from app.errors import InvalidParameterError, DataNotFount
 import uuid
 
@@ -111,10 +114,9 @@ class MenuCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        menu_dbs = session.query(Menu).all()
-        if menu_dbs:
-            obj = [menu.to_dict() for menu in menu_dbs]
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, Menu)
+        if items:
+            self.on_success(res, items, paging)
         else:
             raise DataNotFount()
 
@@ -150,13 +152,16 @@ class MenuItem(BaseResource):
                 menu = Menu.find_one(session, str(menu_id))
                 menu.name = menu_req['name']
                 menu.description = menu_req['description']
-                menu.modules.clear()
-                for id in menu_req['menu_checked']:
-                    module = Module.find_one(session, str(id))
-                    if module is not None:
-                        # Add an association
-                        menu.modules.append(module)
+                try:
+                    checked = {int(id) for id in menu_req['menu_checked']}
+                except (TypeError, ValueError):
+                    raise InvalidParameterError(menu_req['menu_checked'])
+                # Связи только с существующими модулями, проверка одним запросом
+                checked = {row[0] for row in session.query(Module.id).filter(
+                    Module.id.in_(checked))} if checked else set()
+                sync_association(session, menu_has_module_table, 'menu_id', menu_id, 'module_id', checked)
                 session.commit()
+                profiles.invalidate_menu(menu_id)
                 self.on_success(res)
             except IntegrityError:
                 raise InvalidParameterError(req.media)
@@ -168,6 +173,8 @@ class MenuItem(BaseResource):
         session = req.context['session']
         try:
             session.query(Menu).filter(Menu.id == menu_id).delete()
+            session.commit()
+            profiles.invalidate_menu(menu_id)
             self.on_success(res)
         except NoResultFound:
             raise InvalidParameterError(req.media)
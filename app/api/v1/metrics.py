@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import falcon
+
+from app import log
+from app.api.common import BaseResource
+from app.database import engine
+from app.database.pool import pool_stats
+from app.utils.hooks import auth_required
+from app.utils import auth, encoder, holidays, permissions, principal, profiles
+
+LOG = log.get_logger()
+
+
+# Внутренние метрики процесса: пул соединений, кэши и пул хеширования паролей
+class Metrics(BaseResource):
+    """
+    Точка входа: /v1/internal/metrics
+    Значения относятся к процессу (воркеру gunicorn), обработавшему запрос
+    """
+
+    @falcon.before(auth_required)
+    def on_get(self, req, res):
+        obj = {
+            "pool": pool_stats(engine),
+            "caches": {
+                "principals": principal.stats(),
+                "tokens": auth.token_cache_stats(),
+                "holidays": holidays.stats(),
+                "permissions": permissions.stats(),
+                "profiles": profiles.stats(),
+            },
+            "hash_pool": auth.hash_pool_stats(),
+            "encoder": encoder.BACKEND,
+        }
+        self.on_success(res, obj)
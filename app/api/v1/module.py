@@ -9,6 +9,7 @@ from cerberus.errors import ValidationError
 from app import log
 from app.api.common import BaseResource
 from app.utils.hooks import auth_required
+from app.utils import principal, permissions, profiles
 from app.model import ModulePermission, Module
 from app.errors import DataNotFount, InvalidParameterError
 
@@ -113,6 +114,8 @@ class ModuleCollection(BaseResource):
             module.parent_id = module_req['parent_id'] if 'parent_id' in module_req else None
             session.add(module)
             session.commit()
+            permissions.invalidate()
+            profiles.invalidate()
             self.on_success(res, str(module.id))
         else:
             raise InvalidParameterError(req.media)
@@ -120,10 +123,9 @@ class ModuleCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        module_dbs = session.query(Module).all()
-        if module_dbs:
-            obj = [module.to_dict() for module in module_dbs]
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, Module)
+        if items:
+            self.on_success(res, items, paging)
         else:
             raise DataNotFount("Модуль не найдены")
 
@@ -157,6 +159,8 @@ class ModuleItem(BaseResource):
                         'url': module_req['url'],
                 })
                 session.commit()
+                permissions.invalidate()
+                profiles.invalidate()
                 self.on_success(res)
             except IntegrityError:
                 raise InvalidParameterError(req.media)
@@ -168,6 +172,9 @@ class ModuleItem(BaseResource):
         session = req.context['session']
         try:
             session.query(Module).filter(Module.id == module_id).delete()
+            session.commit()
+            permissions.invalidate()
+            profiles.invalidate()
             self.on_success(res)
         except NoResultFound:
             raise InvalidParameterError(req.media)
@@ -193,6 +200,8 @@ class ModulePermissionCollection(BaseResource):
             module_permission.value = module_permission_req['value']
             session.add(module_permission)
             session.commit()
+            permissions.invalidate()
+            profiles.invalidate()
             self.on_success(res, module_permission.id)
         else:
             raise InvalidParameterError(req.media)
@@ -200,10 +209,9 @@ class ModulePermissionCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        module_permission_dbs = session.query(ModulePermission).all()
-        if module_permission_dbs:
-            obj = [module_permission.to_dict() for module_permission in module_permission_dbs]
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, ModulePermission)
+        if items:
+            self.on_success(res, items, paging)
         else:
             raise DataNotFount("Политики не найдены")
 
@@ -239,6 +247,9 @@ class ModulePermissionItem(BaseResource):
                      'value': permission_req['value'],
                 })
                 session.commit()
+                principal.invalidate()
+                permissions.invalidate()
+                profiles.invalidate()
                 self.on_success(res)
             except IntegrityError:
                 raise InvalidParameterError(req.media)
@@ -250,6 +261,10 @@ class ModulePermissionItem(BaseResource):
         session = req.context['session']
         try:
             session.query(ModulePermission).filter(ModulePermission.id == permission_id).delete()
+            session.commit()
+            principal.invalidate()
+            permissions.invalidate()
+            profiles.invalidate()
             self.on_success(res)
         except NoResultFound:
             raise InvalidParameterError(req.media)
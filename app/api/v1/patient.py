@@ -9,12 +9,16 @@ from cerberus.errors import ValidationError
 from app import log
 from app.api.common import BaseResource
 from app.utils.hooks import auth_required
-from app.model.patient import Patient
+from app.model.patient import Patient, SEARCH_MIN_LENGTH
 from app.errors import AppError, InvalidParameterError, UserNotExistsError, DataNotFount
 from datetime import datetime
 
 LOG = log.get_logger()
 
+# Количество результатов поиска пациентов по умолчанию и наибольшее
+SEARCH_LIMIT = 20
+SEARCH_LIMIT_MAX = 100
+
 FIELDS_PATIENT = {
     'last_name': {
         'type': 'string',
@@ -26,6 +30,10 @@ FIELDS_PATIENT = {
         'type': 'string',
         'required': False,
     },
+    'middle_name': {
+        'type': 'string',
+        'required': False,
+    },
     'mobile': {
         'type': 'string',
         'required': False,
@@ -41,6 +49,7 @@ def validate_department_create(req, res, resource, params):
     schema = {
         'last_name': FIELDS_PATIENT['last_name'],
         'first_name': FIELDS_PATIENT['first_name'],
+        'middle_name': FIELDS_PATIENT['middle_name'],
         'mobile': FIELDS_PATIENT['mobile'],
         'source_of_financing': FIELDS_PATIENT['source_of_financing']
     }
@@ -65,15 +74,11 @@ class PatientCollection(BaseResource):
         session = req.context['session']
         patient_req = req.media
         if patient_req:
-            last_name = patient_req['last_name']
-            first_name = patient_req['first_name']
-            mobile = patient_req['first_name']
-            source_of_financing = patient_req['source_of_financing']
-            patient = Patient(first_name=first_name, last_name=last_name, mobile=mobile, source_of_financing=source_of_financing)
-            session.add(patient)
+            patient_id = Patient.upsert(session, patient_req['last_name'], patient_req.get('first_name'),
+                                        patient_req.get('middle_name'), patient_req.get('mobile'))
             session.commit()
             data = {
-                "id": str(patient.id)
+                "id": str(patient_id)
             }
             self.on_success(res, data=data)
         else:
@@ -81,13 +86,24 @@ class PatientCollection(BaseResource):
 
     @falcon.before(auth_required)
     def on_get(self, req, res):
+        if req.get_param_as_bool('stream'):
+            self.on_stream(res, lambda session: session.query(Patient), Patient.to_dict, 'items')
+            return
         session = req.context['session']
-        holiday_dbs = session.query(Patient).all()
-        if holiday_dbs:
-            obj = {
-                "items": [patient.to_dict() for patient in holiday_dbs]
-            }
-            self.on_success(res, obj)
+        q = req.get_param('q')
+        if q:
+            limit = req.get_param_as_int('limit', min=1, max=SEARCH_LIMIT_MAX) or SEARCH_LIMIT
+            try:
+                patient_dbs = Patient.search(session, q, limit)
+            except ValueError:
+                raise InvalidParameterError('q: не менее %s символов' % SEARCH_MIN_LENGTH)
+            if patient_dbs:
+                self.on_success(res, {"items": Patient.to_dict_list(patient_dbs)})
+                return
+            raise DataNotFount()
+        items, paging = self.collection(req, session, Patient)
+        if items:
+            self.on_success(res, {"items": items}, paging)
         else:
             raise DataNotFount()
 
@@ -61,12 +61,9 @@ class PositionCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        position_dbs = session.query(Position).all()
-        if position_dbs:
-            obj = {
-                "items": [position.to_dict() for position in position_dbs]
-            }
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, Position)
+        if items:
+            self.on_success(res, {"items": items}, paging)
         else:
             raise AppError()
 
@@ -1,7 +1,5 @@
 # -*- coding: utf-8 -*-
 import falcon
-import itertools
-import operator
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
@@ -11,7 +9,10 @@ from cerberus.errors import ValidationError
 from app import log
 from app.api.common import BaseResource
 from app.utils.hooks import auth_required
-from app.model import Role, ModulePermission, Module
+from app.utils import principal, permissions, profiles
+from app.model import Role, ModulePermission
+from app.model.module import role_has_permission_table
+from app.utils.alchemy import sync_association
 from app.errors import InvalidParameterError, DataNotFount
 
 LOG = log.get_logger()
@@ -46,66 +47,6 @@ def validate_role_create(req, res, resource, params):
         raise InvalidParameterError('Неверный запрос %s' % req.media)
 
 
-# Получить список прав для модуля
-def module_permissions(session, module_id):
-    query_permissions = session.query(ModulePermission) \
-        .filter(ModulePermission.module_id == module_id).all()
-
-    # Создаем пустой список, для формирования удобного формата
-    permissions = []
-    for d in sorted(query_permissions, key=lambda perm: perm.module_id):
-        permissions.append({
-            'name': d.name,
-            'id': d.id,
-            'method': d.method
-        })
-
-    return permissions
-
-
-# Группировка модулей, для представления в настройках ролей.
-def view_permissions_list(session):
-    # Выбрать теги с категориями
-    menu = session.query(Module).all()
-
-    tmp_dic_children = []  # Список для формирования потомком
-    tmp_dict_parent = []  # Список для формирование родителей
-    result = []  # Результирующий список
-    for d in menu:
-        if bool(d.parent_id):
-            tmp_dic_children.append({
-                'parent_id': d.parent_id,
-                'label': d.name,
-                'id': d.id
-            })
-        else:
-            tmp_dict_parent.append({
-                'id': d.id,
-                'label': d.name
-            })
-
-    # Функция для удаления идентификатора родителя в наследниках
-    def parent_drop(d):
-        del d['parent_id']
-        return d
-
-    # Формируем результат для вывода группировки по родителю
-    for parent, children in itertools.groupby(sorted(tmp_dic_children, key=operator.itemgetter('parent_id')),
-                                              operator.itemgetter('parent_id')):
-        temp = next(item for item in tmp_dict_parent if item["id"] == parent)
-        tmp_dict_methods = []
-        for i in map(parent_drop, children):
-            tmp_dict_methods.append({
-                'label': i['label'],
-                'id': i['id'],
-                'children': module_permissions(session, i['id'])
-            })
-        temp['children'] = tmp_dict_methods
-        result.append(temp)
-
-    return result
-
-
 # Работа с коллекцией ролей
 class RoleCollection(BaseResource):
     """
@@ -131,10 +72,9 @@ class RoleCollection(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
         session = req.context['session']
-        role_dbs = session.query(Role).all()
-        if role_dbs:
-            obj = [role.to_dict() for role in role_dbs]
-            self.on_success(res, obj)
+        items, paging = self.collection(req, session, Role)
+        if items:
+            self.on_success(res, items, paging)
         else:
             raise DataNotFount()
 
@@ -156,7 +96,7 @@ class RoleItem(BaseResource):
             for d in role.permissions:
                 temp_select.append(d.id)
             obj['permission_checked'] = temp_select
-            obj['permission_items'] = view_permissions_list(session)
+            obj['permission_items'] = permissions.get_tree(session)
             self.on_success(res, obj)
         except NoResultFound:
             raise DataNotFount('Роль с идентификатором: %s не найдена' % role_id)
@@ -170,13 +110,19 @@ class RoleItem(BaseResource):
                 role = Role.find_one(session, role_id)
                 role.name = role_req['name']
                 role.role_description = role_req['description']
-                role.permissions.clear()
-                for id in role_req['permission_checked']:
-                    permission= ModulePermission.find_one(session, id)
-                    if permission is not None:
-                        # Add an association
-                        role.permissions.append(permission)
+                try:
+                    checked = {int(id) for id in role_req['permission_checked']}
+                except (TypeError, ValueError):
+                    raise InvalidParameterError(role_req['permission_checked'])
+                # Связи только с существующими правами, проверка одним запросом
+                checked = {row[0] for row in session.query(ModulePermission.id).filter(
+                    ModulePermission.id.in_(checked))} if checked else set()
+                sync_association(session, role_has_permission_table, 'role_id', role_id,
+                                 'module_permission_id', checked)
                 session.commit()
+                principal.invalidate_role(role_id)
+                profiles.invalidate_role(role_id)
+                permissions.invalidate_role(role_id)
                 self.on_success(res)
             except IntegrityError:
                 raise InvalidParameterError(req.media)
@@ -188,6 +134,10 @@ class RoleItem(BaseResource):
         session = req.context['session']
         try:
             session.query(Role).filter(Role.id == role_id).delete()
+            session.commit()
+            principal.invalidate_role(role_id)
+            profiles.invalidate_role(role_id)
+            permissions.invalidate_role(role_id)
             self.on_success(res)
         except NoResultFound:
             raise InvalidParameterError(req.media)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import time
 import falcon
 import datetime
 
@@ -12,12 +13,13 @@ from cerberus.errors import ValidationError
 from app import log
 from app.api.common import BaseResource
 from app.utils.hooks import auth_required
-from app.utils.calendar_shedule import generate
+from app.utils.calendar_shedule import generate_rule
+from app.utils import calendar_shedule
 from app.utils import alchemy
-from app.model.schedule import Schedule
-from app.model.holiday import Holiday
+from app.model.schedule import Schedule, ScheduleRule, ScheduleJob, ScheduleDay
 from app.model.doctor import Doctor
 from app.model.user import User
+from app.tasks import generate_schedule
 from app.errors import AppError, InvalidParameterError, UserNotExistsError, DataNotFount
 
 LOG = log.get_logger()
@@ -58,6 +60,14 @@ FIELDS_SCHEDULE = {
     'interval': {
         'type': 'integer',
         'required': True,
+    },
+    'exceptions': {
+        'type': 'list',
+        'required': False,
+    },
+    'materialize': {
+        'type': 'boolean',
+        'required': False,
     }
 }
 
@@ -73,6 +83,8 @@ def validate_department_create(req, res, resource, params):
         'period': FIELDS_SCHEDULE['period'],
         'workdays': FIELDS_SCHEDULE['workdays'],
         'resource': FIELDS_SCHEDULE['resource'],
+        'exceptions': FIELDS_SCHEDULE['exceptions'],
+        'materialize': FIELDS_SCHEDULE['materialize'],
     }
 
     v = Validator(schema)
@@ -83,6 +95,35 @@ def validate_department_create(req, res, resource, params):
         raise InvalidParameterError('Invalid Request %s' % req.context)
 
 
+# Свободные интервалы врача на день: записанные в таблицу schedule и вычисленные по правилам
+def day_slots(session, doctor_id, day):
+    next_day = day + datetime.timedelta(days=1)
+    schedule_dbs = Schedule.free_between(session, doctor_id, day, next_day)
+    items = [Schedule.slot_dict(*schedule) for schedule in schedule_dbs]
+
+    rules = ScheduleRule.find_active(session, doctor_id, day.date(), day.date())
+    if rules:
+        taken = [calendar_shedule.to_seconds(schedule[1]) for schedule in schedule_dbs]
+        taken.extend(calendar_shedule.to_seconds(date) for date in
+                     Schedule.busy_between(session, doctor_id, day, next_day))
+        holidays = calendar_shedule.holidays_between(session, day, day)
+        slots = calendar_shedule.free_slots(rules, day, day, holidays, taken)
+        items.extend(ScheduleRule.slot_dict(rule_id, calendar_shedule.to_datetime(date_start),
+                                            calendar_shedule.to_datetime(date_end))
+                     for rule_id, date_start, date_end in slots)
+        items.sort(key=lambda item: item['date_start'])
+    return items
+
+
+# Дни, начиная с day, в которые у врача есть свободные интервалы, по сводке schedule_day
+def calendar_days(session, doctor_id, day):
+    days = ScheduleDay.free_days(session, doctor_id, day.date())
+    if not days:
+        return []
+    holidays = calendar_shedule.holidays_between(session, days[0], days[-1])
+    return [datetime.datetime.combine(date, datetime.time()) for date in days if date not in holidays]
+
+
 # Работа с коллекцией подразделения
 class ScheduleCollection(BaseResource):
     """
@@ -119,20 +160,46 @@ class ScheduleCollection(BaseResource):
             interval = schedule_req['interval']
             doctor = schedule_req['doctor']
             workdays = schedule_req['workdays']
-            holidays_dbs = session.query(Holiday.date).filter(
-                func.extract('year', Holiday.date) == datetime.datetime.today().year).all()
-            if holidays_dbs:
-                try:
-                    generate(start_date=date_start, end_date=date_end, holidays_list=holidays_dbs,
-                             start_time=start_time,
-                             end_time=end_time, workdays_list=workdays,
-                             interval=interval, doctor=doctor, creator=req.context['user'], session=session)
+            started = time.monotonic()
+            try:
+                # Построчная запись интервалов выполняется фоновой задачей,
+                # по умолчанию сохраняется только правило расписания
+                if schedule_req.get('materialize'):
+                    calendar_shedule.validate_params(start_date=date_start, end_date=date_end, workdays_list=workdays,
+                                                     start_time=start_time, end_time=end_time, interval=interval)
+                    job = ScheduleJob(doctor_id=doctor, creator_id=req.context['user'], status=ScheduleJob.PENDING,
+                                      count=0, params={
+                                          'date_start': date_start,
+                                          'date_end': date_end,
+                                          'start_time': start_time,
+                                          'end_time': end_time,
+                                          'interval': interval,
+                                          'workdays': workdays,
+                                      })
+                    session.add(job)
+                    session.commit()
+                    generate_schedule.delay(job.id)
                     data = {
-                        "message": "Расписание успешно добавлено"
+                        "message": "Формирование расписания запущено",
+                        "job_id": str(job.id)
                     }
-                    self.on_success(res, data=data)
-                except:
-                    self.on_error(res, data={})
+                else:
+                    rule = generate_rule(start_date=date_start, end_date=date_end, workdays_list=workdays,
+                                         start_time=start_time, end_time=end_time, interval=interval,
+                                         exceptions=schedule_req.get('exceptions'), doctor=doctor,
+                                         creator=req.context['user'])
+                    session.add(rule)
+                    session.flush()
+                    calendar_shedule.refresh_days(session, doctor, rule.date_from, rule.date_to)
+                    session.commit()
+                    data = {
+                        "message": "Расписание успешно добавлено",
+                        "id": str(rule.id),
+                        "elapsed": round(time.monotonic() - started, 3)
+                    }
+            except ValueError as ex:
+                raise InvalidParameterError(str(ex))
+            self.on_success(res, data=data)
         else:
             raise InvalidParameterError(req.media)
 
@@ -159,10 +226,7 @@ class ScheduleCollection(BaseResource):
         if not req.get_param_as_bool('all') and not req.get_param_as_bool('calendar'):
             if req.params['doctor_id'] and req.params['date']:
                 day = datetime.datetime.strptime(req.params['date'], "%d.%m.%Y")
-                schedule_dbs = session.query(Schedule).filter(
-                    and_(Schedule.date_start >= day, Schedule.date_start < day + datetime.timedelta(days=1),
-                         Schedule.is_busy == False, Schedule.doctor_id == int(req.params['doctor_id']))).all()
-                obj = {"items": [schedule.to_dict_reseption() for schedule in schedule_dbs]}
+                obj = {"items": day_slots(session, int(req.params['doctor_id']), day)}
         else:
             obj = {
                 "items": []
@@ -185,23 +249,31 @@ class ScheduleCollection(BaseResource):
                          join(subq, and_(Doctor.id == subq.c.doctor_id)).join(User, and_(Doctor.user_id == User.id))
                          ).all()
 
-            if schedules:
+            # Периоды действия правил расписания
+            rules = (session.query(ScheduleRule.doctor_id, func.min(ScheduleRule.date_from),
+                                   func.max(ScheduleRule.date_to), User.last_name, User.first_name,
+                                   User.middle_name).
+                     join(Doctor, and_(Doctor.id == ScheduleRule.doctor_id)).join(User, and_(Doctor.user_id == User.id)).
+                     group_by(ScheduleRule.doctor_id, User.last_name, User.first_name, User.middle_name)
+                     ).all()
+
+            if schedules or rules:
                 obj = {
                     "items": [{
                         "doctor": schedule[4] + ' ' + schedule[5] + ' ' + schedule[6],
                         "date_start": alchemy.datetime_to_timestamp(schedule[2]),
                         "date_end": alchemy.datetime_to_timestamp(schedule[3])
-                    } for schedule in schedules]
+                    } for schedule in schedules] + [{
+                        "doctor": rule[3] + ' ' + rule[4] + ' ' + rule[5],
+                        "date_start": alchemy.datetime_to_timestamp(rule[1]),
+                        "date_end": alchemy.datetime_to_timestamp(rule[2])
+                    } for rule in rules]
                 }
 
         if req.get_param_as_bool('calendar') and not req.get_param_as_bool('all'):
             day = datetime.datetime.strptime(req.params['date'], "%d.%m.%Y")
-            dates = session.query(func.to_char(Schedule.date_start, 'YYYY-MM-DD').label('day')).filter(
-                and_(Schedule.date_start >= day,
-                     Schedule.is_busy == False, Schedule.doctor_id == int(req.params['doctor_id']))
-            ).group_by('day').order_by('day').all()
-
-            obj = {"items": [int(datetime.datetime.strptime(date[0], '%Y-%m-%d').timestamp()) * 1000 for date in dates]}
+            obj = {"items": [int(date.timestamp()) * 1000
+                             for date in calendar_days(session, int(req.params['doctor_id']), day)]}
 
         if len(obj.get('items')):
             self.on_success(res, obj)
@@ -209,6 +281,22 @@ class ScheduleCollection(BaseResource):
             raise DataNotFount()
 
 
+# Состояние фоновой задачи формирования расписания
+class ScheduleJobItem(BaseResource):
+    """
+    Handle for endpoint: /v1/schedules/jobs/{job_id}
+    """
+
+    @falcon.before(auth_required)
+    def on_get(self, req, res, job_id):
+        session = req.context['session']
+        try:
+            job_db = ScheduleJob.find_one(session, job_id)
+            self.on_success(res, job_db.to_dict())
+        except NoResultFound:
+            raise DataNotFount('job_id: %s' % job_id)
+
+
 class ScheduleCalendarFilter(BaseResource):
     @falcon.before(auth_required)
     def on_get(self, req, res):
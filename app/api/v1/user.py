@@ -4,6 +4,7 @@ import re
 import falcon
 import base64
 
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.exc import IntegrityError
 from cerberus import Validator
@@ -12,12 +13,18 @@ from cerberus.errors import ValidationError
 from app import log
 from app.api.common import BaseResource
 from app.utils.hooks import auth_required
-from app.utils.auth import encrypt_token, hash_password, verify_password, uuid, decrypt_token
+from app.utils import principal, profiles
+from app.utils.auth import encrypt_token, hash_password, verify_password, uuid, decode_token, evict_token, \
+    evict_numeric_id
 from app.model import User, Menu, Role, Position, Department
 from app.errors import AppError, InvalidParameterError, UserNotExistsError, PasswordNotMatch
 
 LOG = log.get_logger()
 
+# Поля списка пользователей, доступные для выбора и фильтров (без токена и служебных данных)
+USER_COLLECTION_FIELDS = ('id', 'username', 'email', 'last_name', 'first_name', 'middle_name', 'phone',
+                          'role_id', 'menu_id', 'created', 'modified')
+
 FIELDS = {
     'username': {
         'type': 'string',
@@ -127,6 +134,13 @@ def validate_user_create(req, res, resource, params):
         raise InvalidParameterError('Invalid Request %s' % req.media)
 
 
+# Сброс расшифрованных токенов пользователя из кэша при блокировке и удалении
+def evict_user_tokens(session, user_id):
+    user_db = session.query(User.numeric_id).filter(User.id == user_id).first()
+    if user_db:
+        evict_numeric_id(user_db[0])
+
+
 class UserCollection(BaseResource):
     """
     Handle for endpoint: /v1/settings/users
@@ -170,15 +184,17 @@ class UserCollection(BaseResource):
 
     @falcon.before(auth_required)
     def on_get(self, req, res):
+        if req.get_param_as_bool('stream'):
+            serialize = User.dict_users_list if req.get_param_as_bool('sl') else User.to_dict_all
+            self.on_stream(res, lambda session: session.query(User).options(joinedload(User.position)), serialize)
+            return
         session = req.context['session']
-        user_dbs = session.query(User).all()
-        if user_dbs:
-            # Если идет запрос простого списка Simple List
-            if req.get_param_as_bool('sl'):
-                obj = [user.dict_users_list() for user in user_dbs]
-            else:
-                obj = [user.to_dict_all() for user in user_dbs]
-            self.on_success(res, obj)
+        # Если идет запрос простого списка Simple List
+        serialize = User.dict_users_list if req.get_param_as_bool('sl') else User.to_dict_all
+        items, paging = self.collection(req, session, User, options=(joinedload(User.position),),
+                                        serialize=serialize, fields=USER_COLLECTION_FIELDS)
+        if items:
+            self.on_success(res, items, paging)
         else:
             raise AppError()
 
@@ -220,6 +236,9 @@ class UserItem(BaseResource):
                     'position_id': user_req['position_id'],
                     'info': user_req['info'] if 'info' in user_req else None})
                 session.commit()
+                principal.invalidate_user(user_id)
+                if user_req.get('blocked'):
+                    evict_user_tokens(session, user_id)
 
                 self.on_success(res)
             except IntegrityError:
@@ -232,7 +251,10 @@ class UserItem(BaseResource):
         session = req.context['session']
         try:
 
+            evict_user_tokens(session, user_id)
             session.query(User).filter(User.id == user_id).delete()
+            session.commit()
+            principal.invalidate_user(user_id)
             self.on_success(res)
         except NoResultFound:
             raise InvalidParameterError(req.media)
@@ -243,9 +265,9 @@ class Signin(BaseResource):
         session = req.context['session']
         token = req.get_param('token')
         try:
-            user_db = User.find_by_numeric_id(session, str(int(decrypt_token(token))))
+            user_db = User.find_by_numeric_id(session, str(int(decode_token(token))))
             if not user_db.blocked:
-                self.on_success(res, user_db.auth_info())
+                self.on_success_encoded(res, profiles.auth_info(session, user_db))
                 # self.on_success(res, user_db.to_test_one())
             else:
                 raise UserNotExistsError('Токен заблокирован. Обратитесь к администратору.')
@@ -293,6 +315,8 @@ class Auth(BaseResource):
             raise UserNotExistsError('Пользователь: %s не найден. Проверьте правильность ввода данных.' % username)
 
     def process_signout(self, req, res):
+        if req.auth is not None:
+            evict_token(req.auth)
         self.on_success(res)
 
     # Регистрация нового пользователя, через форму регистрации
@@ -11,10 +11,11 @@ from app.api.common import BaseResource
 from app.utils.hooks import auth_required
 from app.model.patient import Patient
 from app.model.visit import Visit
-from app.model.schedule import Schedule
-from app.errors import AppError, InvalidParameterError, UserNotExistsError, DataNotFount
+from app.model.schedule import Schedule, ScheduleRule
+from app.utils import calendar_shedule
+from app.errors import AppError, InvalidParameterError, UserNotExistsError, DataNotFount, SlotBusyError
 from datetime import datetime, timedelta
-from sqlalchemy import and_
+from sqlalchemy import and_, text
 
 LOG = log.get_logger()
 
@@ -44,7 +45,17 @@ FIELDS_VISIT = {
     },
     'schedule_id': {
         'type': 'integer',
-        'required': True,
+        'required': False,
+        'excludes': 'rule_id',
+    },
+    'rule_id': {
+        'type': 'integer',
+        'required': False,
+        'dependencies': 'date_start',
+    },
+    'date_start': {
+        'type': 'integer',
+        'required': False,
     },
     'doctor_id': {
         'type': 'integer',
@@ -67,6 +78,8 @@ def validate_visit_create(req, res, resource, params):
         'first_name': FIELDS_VISIT['first_name'],
         'middle_name': FIELDS_VISIT['middle_name'],
         'schedule_id': FIELDS_VISIT['schedule_id'],
+        'rule_id': FIELDS_VISIT['rule_id'],
+        'date_start': FIELDS_VISIT['date_start'],
         'doctor_id': FIELDS_VISIT['doctor_id'],
         'mobile': FIELDS_VISIT['mobile'],
         'source_of_financing': FIELDS_VISIT['source_of_financing'],
@@ -79,6 +92,33 @@ def validate_visit_create(req, res, resource, params):
             raise InvalidParameterError(v.errors)
     except ValidationError:
         raise InvalidParameterError('Invalid Request %s' % req.context)
+    if 'schedule_id' not in req.media and 'rule_id' not in req.media:
+        raise InvalidParameterError({'schedule_id': ['required field']})
+
+
+# Запись интервала правила расписания в таблицу schedule в момент записи на прием
+def materialize_slot(session, rule_id, date_start, doctor_id, creator):
+    try:
+        rule = ScheduleRule.find_one(session, rule_id)
+    except NoResultFound:
+        raise InvalidParameterError('rule_id: %s' % rule_id)
+    if rule.doctor_id != doctor_id:
+        raise InvalidParameterError('rule_id: %s не относится к doctor_id: %s' % (rule_id, doctor_id))
+    date_start = datetime.fromtimestamp(date_start / 1000.0)
+    holidays = calendar_shedule.holidays_between(session, date_start, date_start)
+    date_end = calendar_shedule.rule_contains(rule, date_start, holidays)
+    if date_end is None:
+        raise InvalidParameterError('date_start: %s' % date_start)
+    # Блокировка на время транзакции, чтобы один интервал не был записан в таблицу дважды
+    session.execute(text('SELECT pg_advisory_xact_lock(:doctor_id, :minute)'),
+                    {'doctor_id': rule.doctor_id, 'minute': calendar_shedule.to_seconds(date_start) // 60})
+    schedule_db = session.query(Schedule.id).filter(
+        and_(Schedule.doctor_id == rule.doctor_id, Schedule.date_start == date_start)).first()
+    if schedule_db:
+        return schedule_db[0]
+    return session.execute(Schedule.__table__.insert().values(
+        date_start=date_start, date_end=date_end, doctor_id=rule.doctor_id, creator_id=creator,
+        is_busy=False).returning(Schedule.__table__.c.id)).scalar()
 
 
 class VisitCollection(BaseResource):
@@ -92,34 +132,22 @@ class VisitCollection(BaseResource):
         session = req.context['session']
         visit_req = req.media
         if visit_req:
-            patient = Patient()
-            patient.first_name = visit_req['first_name']
-            patient.last_name = visit_req['last_name']
-            patient.middle_name = visit_req['middle_name']
-            patient.mobile = visit_req['mobile']
-            session.add(patient)
+            if 'schedule_id' in visit_req:
+                schedule_id = visit_req['schedule_id']
+            else:
+                schedule_id = materialize_slot(session, visit_req['rule_id'], visit_req['date_start'],
+                                               visit_req['doctor_id'], req.context['user'])
+            visit_id = Visit.book(session, schedule_id, visit_req, req.context['user'],
+                                  source_of_financing=visit_req.get('source_of_financing'),
+                                  comment=visit_req.get('comment'))
+            if visit_id is None:
+                session.rollback()
+                raise SlotBusyError('schedule_id: %s' % schedule_id)
             session.commit()
-
-            if patient.id:
-                visit = Visit()
-                visit.patient_id = patient.id
-                visit.creator_id = req.context['user']
-                visit.doctor_id = visit_req['doctor_id']
-                visit.schedule_id = visit_req['schedule_id']
-                visit.source_of_financing = visit_req['source_of_financing']
-                visit.comment = visit_req['comment']
-
-                session.add(visit)
-
-                # TODO: Добавить выбивание графика в Schedule
-                session.query(Schedule).filter(Schedule.id == visit_req['schedule_id']).update({
-                    'is_busy': True
-                })
-                session.commit()
-                data = {
-                    "id": str(visit.id)
-                }
-                self.on_success(res, data=data)
+            data = {
+                "id": str(visit_id)
+            }
+            self.on_success(res, data=data)
         else:
             raise InvalidParameterError(req.media)
 
@@ -143,10 +171,14 @@ class VisitCollection(BaseResource):
         else:
             date_start = datetime.now().strftime('%Y-%m-%d')
             date_end = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-        visit_dbs = session.query(Visit).join(Schedule).filter(and_(Schedule.date_start >= date_start, Schedule.date_end <= date_end)).all()
+        if req.get_param_as_bool('stream'):
+            self.on_stream(res, lambda stream_session: Visit.calendar_query(stream_session, date_start, date_end),
+                           Visit.calendar_item, 'items')
+            return
+        visit_dbs = Visit.calendar_query(session, date_start, date_end).all()
         if visit_dbs:
             obj = {
-                "items": [visit.to_dict() for visit in visit_dbs]
+                "items": [Visit.calendar_item(visit) for visit in visit_dbs]
             }
             self.on_success(res, obj)
         else:
@@ -29,6 +29,27 @@ else:
     DATABASE_URL = "postgresql+psycopg2://%s:%s@%s/%s" % DB_CONFIG
 
 DB_ECHO = True if CONFIG['database']['echo'] == 'yes' else False
+# Пул соединений одного процесса: при N воркерах gunicorn к БД открывается до N * (pool_size + max_overflow)
+DB_POOL_SIZE = int(CONFIG['database'].get('pool_size', 10))
+DB_MAX_OVERFLOW = int(CONFIG['database'].get('max_overflow', 30))
+DB_POOL_TIMEOUT = float(CONFIG['database'].get('pool_timeout', 30))
+DB_POOL_RECYCLE = int(CONFIG['database'].get('pool_recycle', 3600))
+DB_POOL_PRE_PING = CONFIG['database'].get('pool_pre_ping', 'no') == 'yes'
 DB_AUTOCOMMIT = True
 
-LOG_LEVEL = CONFIG['logging']['level']
\ No newline at end of file
+LOG_LEVEL = CONFIG['logging']['level']
+
+SECURITY = CONFIG['security'] if CONFIG.has_section('security') else {}
+# Стоимость bcrypt и пул процессов для хеширования паролей (0 процессов - хеширование в текущем процессе)
+BCRYPT_ROUNDS = int(SECURITY.get('bcrypt_rounds', 12))
+HASH_WORKERS = int(SECURITY.get('hash_workers', 2))
+HASH_QUEUE_LIMIT = int(SECURITY.get('hash_queue_limit', 32))
+HASH_TIMEOUT = float(SECURITY.get('hash_timeout', 10))
+# Проверка прав ролей по правилам модулей (url без префикса версии API)
+ENFORCE_PERMISSIONS = SECURITY.get('enforce_permissions', 'no') == 'yes'
+PERMISSION_URL_PREFIX = SECURITY.get('permission_url_prefix', '/v1')
+
+CELERY = CONFIG['celery'] if CONFIG.has_section('celery') else {}
+CELERY_BROKER_URL = CELERY.get('broker_url', 'memory://')
+# Выполнение задач в процессе приложения, без брокера (локально и в тестах)
+CELERY_ALWAYS_EAGER = CELERY.get('always_eager', 'no') == 'yes'
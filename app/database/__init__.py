@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker, scoped_session
 
 from app import log
 from app import config
+from app.database.pool import InstrumentedQueuePool, instrument
 
 LOG = log.get_logger()
 
@@ -12,16 +13,18 @@ LOG = log.get_logger()
 def get_engine(uri):
     LOG.info('Connecting to database..')
     options = {
-        'pool_recycle': 3600,
-        'pool_size': 10,
-        'pool_timeout': 30,
-        'max_overflow': 30,
+        'poolclass': InstrumentedQueuePool,
+        'pool_recycle': config.DB_POOL_RECYCLE,
+        'pool_size': config.DB_POOL_SIZE,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_pre_ping': config.DB_POOL_PRE_PING,
         'echo': config.DB_ECHO,
         'execution_options': {
             'autocommit': config.DB_AUTOCOMMIT
         }
     }
-    return create_engine(uri, **options)
+    return instrument(create_engine(uri, **options))
 
 
 db_session = scoped_session(sessionmaker())
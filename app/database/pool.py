@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+_lock = threading.Lock()
+
+# Счетчики пула соединений процесса (каждый воркер gunicorn ведет свои)
+_metrics = {
+    'checkouts': 0,
+    'checkout_time_total': 0.0,
+    'checkout_time_max': 0.0,
+    'waits': 0,  # Выдачи, ожидавшие освобождения соединения (пул и overflow исчерпаны)
+    'wait_time_total': 0.0,
+    'wait_time_max': 0.0,
+    'timeouts': 0,
+    'overflow_peak': 0,
+    'checked_out_peak': 0,
+    'connects': 0,
+    'closes': 0,
+    'invalidations': 0,
+    'age_total': 0.0,  # Возраст соединения в момент выдачи
+    'age_max': 0.0,
+}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool с замером времени получения соединения.
+    Ожиданием считается получение при исчерпанных пуле и overflow. Состояние пула читается
+    публичными checkedin()/overflow() до вызова QueuePool._do_get без блокировки пула,
+    поэтому счетчик ожиданий приблизительный: соседний поток может успеть вернуть
+    или занять соединение между проверкой и получением.
+    """
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        # Предел overflow без обращения к закрытым атрибутам QueuePool, -1 - без ограничения
+        self.overflow_limit = max_overflow
+        super(InstrumentedQueuePool, self).__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+
+    def _do_get(self):
+        exhausted = self.checkedin() == 0 and -1 < self.overflow_limit <= self.overflow()
+        started = time.monotonic()
+        try:
+            return super(InstrumentedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            with _lock:
+                _metrics['timeouts'] += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with _lock:
+                _metrics['checkouts'] += 1
+                _metrics['checkout_time_total'] += elapsed
+                _metrics['checkout_time_max'] = max(_metrics['checkout_time_max'], elapsed)
+                if exhausted:
+                    _metrics['waits'] += 1
+                    _metrics['wait_time_total'] += elapsed
+                    _metrics['wait_time_max'] = max(_metrics['wait_time_max'], elapsed)
+
+
+def instrument(engine):
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        connection_record.info['connected_at'] = time.monotonic()
+        with _lock:
+            _metrics['connects'] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        age = time.monotonic() - connection_record.info.get('connected_at', time.monotonic())
+        with _lock:
+            _metrics['age_total'] += age
+            _metrics['age_max'] = max(_metrics['age_max'], age)
+            _metrics['overflow_peak'] = max(_metrics['overflow_peak'], engine.pool.overflow())
+            _metrics['checked_out_peak'] = max(_metrics['checked_out_peak'], engine.pool.checkedout())
+
+    @event.listens_for(engine, 'close')
+    def _close(dbapi_connection, connection_record):
+        with _lock:
+            _metrics['closes'] += 1
+
+    @event.listens_for(engine, 'invalidate')
+    def _invalidate(dbapi_connection, connection_record, exception):
+        with _lock:
+            _metrics['invalidations'] += 1
+
+    return engine
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    with _lock:
+        stats = dict(_metrics)
+    stats['pid'] = os.getpid()
+    stats['size'] = pool.size()
+    stats['max_overflow'] = pool.overflow_limit
+    stats['timeout'] = pool.timeout()
+    stats['checked_in'] = pool.checkedin()
+    stats['checked_out'] = pool.checkedout()
+    stats['overflow'] = pool.overflow()
+    stats['checkout_time_avg'] = stats['checkout_time_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    stats['wait_time_avg'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+    stats['age_avg'] = stats['age_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    return stats
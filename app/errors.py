@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-import json
 import falcon
 
 try:
@@ -8,6 +7,8 @@ try:
 except ImportError:
     OrderedDict = dict
 
+from app.utils import encoder
+
 OK = {
     'status': falcon.HTTP_200,
     'code': 200,
@@ -59,6 +60,23 @@ ERR_PASSWORD_NOT_MATCH = {
     'code': 22,
     'title': 'Пароль не соответствует'
 }
+ERR_SERVICE_UNAVAILABLE = {
+    'status': falcon.HTTP_503,
+    'code': 78,
+    'title': 'Сервис временно перегружен, повторите запрос позже'
+}
+
+ERR_PERMISSION_DENIED = {
+    'status': falcon.HTTP_403,
+    'code': 98,
+    'title': 'Недостаточно прав'
+}
+
+ERR_SLOT_BUSY = {
+    'status': falcon.HTTP_409,
+    'code': 41,
+    'title': 'Время приема уже занято'
+}
 ERR_CONNECT_MEGAPLAN = {
     'status': falcon.HTTP_403,
     'code': 1001,
@@ -95,7 +113,7 @@ class AppError(Exception):
         meta['message'] = exception.title
         if exception.description:
             meta['description'] = exception.description
-        res.body = json.dumps({'meta': meta})
+        res.data = encoder.dumps({'meta': meta})
 
 
 class InvalidParameterError(AppError):
@@ -144,6 +162,24 @@ class DataNotFount(AppError):
         self.error['description'] = description
 
 
+class ServiceUnavailableError(AppError):
+    def __init__(self, description=None):
+        super().__init__(ERR_SERVICE_UNAVAILABLE)
+        self.error['description'] = description
+
+
+class ForbiddenError(AppError):
+    def __init__(self, description=None):
+        super().__init__(ERR_PERMISSION_DENIED)
+        self.error['description'] = description
+
+
+class SlotBusyError(AppError):
+    def __init__(self, description=None):
+        super().__init__(ERR_SLOT_BUSY)
+        self.error['description'] = description
+
+
 class NotConnectMegaplanError(AppError):
     def __init__(self, description=None):
         super().__init__(ERR_CONNECT_MEGAPLAN)
@@ -5,11 +5,12 @@ import functools
 
 from app import log
 from app import config
-from app.middleware import AuthHandler, JSONTranslator, DatabaseSessionManager
+from app.middleware import AuthHandler, JSONTranslator, DatabaseSessionManager, PermissionHandler
 from app.database import db_session, init_session
 
 from app.api.common import base
-from app.api.v1 import user, role, module, menu, department, position, doctor, holiday, patient, schedule, visit
+from app.api.v1 import user, role, module, menu, department, position, doctor, holiday, patient, schedule, visit, \
+    metrics
 from app.errors import AppError
 from falcon_cors import CORS
 from falcon_multipart.middleware import MultipartMiddleware
@@ -68,16 +69,19 @@ class App(falcon.API):
 
         # Endpoint "Расписание"
         self.add_route('/v1/schedules', schedule.ScheduleCollection())
+        self.add_route('/v1/schedules/jobs/{job_id:int}', schedule.ScheduleJobItem())
         # Endpoint "Запись на прием"
         self.add_route('/v1/visits', visit.VisitCollection())
+        # Endpoint "Внутренние метрики процесса"
+        self.add_route('/v1/internal/metrics', metrics.Metrics())
 
 
         self.add_error_handler(AppError, AppError.handle)
 
 
 init_session()
-middleware = [AuthHandler(), JSONTranslator(), DatabaseSessionManager(db_session), cors.middleware,
-              MultipartMiddleware()]
+middleware = [AuthHandler(), JSONTranslator(), DatabaseSessionManager(db_session), PermissionHandler(),
+              cors.middleware, MultipartMiddleware()]
 application = App(middleware=middleware)
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
 from .auth import AuthHandler
+from .permissions import PermissionHandler
 from .session_manager import DatabaseSessionManager
 from .translator import JSONTranslator
\ No newline at end of file
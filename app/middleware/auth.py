@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from app import log
-from app.utils.auth import decrypt_token
+from app.utils.auth import decode_token
 from app.errors import UnauthorizedError
 
 
@@ -13,10 +13,10 @@ class AuthHandler(object):
     def process_request(self, req, res):
         LOG.debug("Authorization: %s", req.auth)
         if req.auth is not None:
-            token = decrypt_token(req.auth)
-            if token is None:
+            numeric_id = decode_token(req.auth)
+            if numeric_id is None:
                 raise UnauthorizedError('Invalid auth token: %s' % req.auth)
             else:
-                req.context['auth_user'] = token.decode('utf-8')
+                req.context['auth_user'] = numeric_id
         else:
             req.context['auth_user'] = None
\ No newline at end of file
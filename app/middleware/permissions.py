@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from app import log
+from app import config
+from app.errors import ForbiddenError, UnauthorizedError
+from app.utils import permissions
+from app.utils.principal import get_principal
+
+LOG = log.get_logger()
+
+# Пути, доступные без проверки прав (помимо корня '/'): авторизация
+EXEMPT_PREFIXES = ('/v1/auth',)
+
+
+class PermissionHandler(object):
+    """
+    Проверка прав роли пользователя на метод и url запроса по правилам ModulePermission.
+    Включается параметром enforce_permissions в секции [security].
+    Запросы без токена пропускаются: их отклоняет хук auth_required.
+    """
+
+    def process_resource(self, req, res, resource, params):
+        if not config.ENFORCE_PERMISSIONS or req.method == 'OPTIONS' or not req.context.get('auth_user'):
+            return
+        path = req.path
+        if path == '/' or path.startswith(EXEMPT_PREFIXES):
+            return
+        session = req.context['session']
+        principal = get_principal(session, req.context['auth_user'])
+        if principal is None:
+            return
+        if principal.blocked:
+            raise UnauthorizedError('User is blocked')
+        req.context['principal'] = principal
+        if path.startswith(config.PERMISSION_URL_PREFIX):
+            path = path[len(config.PERMISSION_URL_PREFIX):]
+        if not permissions.get_matcher(session, principal.role_id).match(req.method, path):
+            LOG.info('Permission denied: role %s, %s %s', principal.role_id, req.method, req.path)
+            raise ForbiddenError('%s %s' % (req.method, req.path))
@@ -2,14 +2,70 @@
 
 import falcon
 import sqlalchemy.orm.scoping as scoping
+from sqlalchemy import event
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 
 from app import log
 from app import config
+from app.database import engine
 from app.errors import DatabaseError, ERR_DATABASE_ROLLBACK
 
 LOG = log.get_logger()
 
+# Методы, для которых транзакция открывается только на чтение
+READ_ONLY_METHODS = ('GET', 'HEAD')
+
+# Запросы, не изменяющие данные: остальные помечают единицу работы как измененную
+READ_STATEMENTS = ('SELECT', 'SET', 'SHOW')
+
+
+# Счетчики запроса: фиксации, обращения к БД и изменяющие запросы после последней фиксации
+def new_stats():
+    return {'commits': 0, 'round_trips': 0, 'writes': 0}
+
+
+# Счетчики сессии запроса привязываются к соединению на время транзакции
+@event.listens_for(Session, 'after_begin')
+def _after_begin(session, transaction, connection):
+    stats = session.info.get('db_stats')
+    if stats is None:
+        return
+    connection.info['db_stats'] = stats
+    if session.info.get('read_only') and not transaction.nested:
+        connection.execute('SET TRANSACTION READ ONLY')
+
+
+@event.listens_for(engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = conn.info.get('db_stats')
+    if stats is not None:
+        stats['round_trips'] += 1
+        if not statement.lstrip().upper().startswith(READ_STATEMENTS):
+            stats['writes'] += 1
+
+
+@event.listens_for(engine, 'commit')
+def _commit(conn):
+    stats = conn.info.get('db_stats')
+    if stats is not None:
+        stats['round_trips'] += 1
+        stats['commits'] += 1
+        stats['writes'] = 0
+
+
+@event.listens_for(engine, 'rollback')
+def _rollback(conn):
+    stats = conn.info.get('db_stats')
+    if stats is not None:
+        stats['round_trips'] += 1
+        stats['writes'] = 0
+
+
+@event.listens_for(engine, 'checkin')
+def _checkin(dbapi_connection, connection_record):
+    connection_record.info.pop('db_stats', None)
+
 
 class DatabaseSessionManager(object):
     def __init__(self, db_session):
@@ -20,24 +76,37 @@ class DatabaseSessionManager(object):
         """
         Handle post-processing of the response (after routing).
         """
-        req.context['session'] = self._session_factory
+        session = self._session_factory
+        stats = new_stats()
+        session.info['db_stats'] = stats
+        session.info['read_only'] = req.method in READ_ONLY_METHODS
+        req.context['session'] = session
+        req.context['db_stats'] = stats
 
     def process_response(self, req, res, resource=None):
         """
         Handle post-processing of the response (after routing).
+        Фиксация выполняется только если после последней фиксации были изменения.
         """
         session = req.context['session']
+        stats = req.context['db_stats']
+
+        try:
+            if config.DB_AUTOCOMMIT and (stats['writes'] or session.new or session.dirty or session.deleted):
+                try:
+                    session.commit()
+                except SQLAlchemyError as ex:
+                    session.rollback()
+                    raise DatabaseError(ERR_DATABASE_ROLLBACK, ex.args, ex.params)
+        finally:
+            res.set_header('X-DB-Commits', str(stats['commits']))
+            res.set_header('X-DB-Round-Trips', str(stats['round_trips']))
+            session.info.pop('db_stats', None)
+            session.info.pop('read_only', None)
 
-        if config.DB_AUTOCOMMIT:
-            try:
-                session.commit()
-            except SQLAlchemyError as ex:
-                session.rollback()
-                raise DatabaseError(ERR_DATABASE_ROLLBACK, ex.args, ex.params)
-
-        if self._scoped:
-            # remove any database-loaded state from all current objects
-            # so that the next access of any attribute, or any query execution will retrieve new state
-            session.remove()
-        else:
-            session.close()
\ No newline at end of file
+            if self._scoped:
+                # remove any database-loaded state from all current objects
+                # so that the next access of any attribute, or any query execution will retrieve new state
+                session.remove()
+            else:
+                session.close()
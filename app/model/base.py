@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
-from sqlalchemy import Column
+from operator import attrgetter
+
+from sqlalchemy import Column, event
 from sqlalchemy import DateTime, func
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 
@@ -10,6 +12,32 @@ from app.utils import alchemy
 LOG = log.get_logger()
 
 
+# Преобразователь значения поля: пустые значения выводятся как в BaseModel.isNone
+def _converter(convert):
+    def converter(value):
+        if value:
+            return convert(value)
+        return '' if value is None else str(value)
+    return converter
+
+
+# Сериализатор модели: поля FIELDS, являющиеся столбцами таблицы, читаются одним attrgetter.
+# keys - подмножество полей; подходит и для строк выборки отдельных столбцов
+def compile_serializer(cls, keys=None):
+    keys = cls.serialized_fields() if keys is None else tuple(keys)
+    converters = tuple(_converter(cls.FIELDS[key]) for key in keys)
+    if not keys:
+        return lambda obj: {}
+    getter = attrgetter(*keys)
+    if len(keys) == 1:
+        key, convert = keys[0], converters[0]
+        return lambda obj: {key: convert(getter(obj))}
+
+    def serializer(obj):
+        return {key: convert(value) for key, convert, value in zip(keys, converters, getter(obj))}
+    return serializer
+
+
 class BaseModel(object):
     created = Column(DateTime, default=func.now())
     modified = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -37,17 +65,27 @@ class BaseModel(object):
             return ''
 
     def to_dict(self):
-        intersection = set(self.__table__.columns.keys()) & set(self.FIELDS)
-        return dict(map(
-            lambda key:
-            (key,
-             (lambda value: self.FIELDS[key](value) if value else self.isNone(value))
-             (getattr(self, key))),
-            intersection))
+        return self._serializer(self)
+
+    # Поля, выводимые to_dict по умолчанию
+    @classmethod
+    def serialized_fields(cls):
+        return tuple(key for key in cls.__table__.columns.keys() if key in cls.FIELDS)
+
+    # Сериализация списка строк одним вызовом
+    @classmethod
+    def to_dict_list(cls, rows):
+        serializer = cls._serializer if cls.to_dict is BaseModel.to_dict else cls.to_dict
+        return list(map(serializer, rows))
 
     FIELDS = {
-        'created': alchemy.datetime_to_timestamp,
-        'modified': alchemy.datetime_to_timestamp,
+        'created': alchemy.passby,
+        'modified': alchemy.passby,
     }
 
-Base = declarative_base(cls=BaseModel)
\ No newline at end of file
+Base = declarative_base(cls=BaseModel)
+
+
+@event.listens_for(Base, 'instrument_class', propagate=True)
+def _compile_serializer(mapper, cls):
+    cls._serializer = staticmethod(compile_serializer(cls))
\ No newline at end of file
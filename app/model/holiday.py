@@ -12,7 +12,7 @@ from datetime import datetime
 class Holiday(Base):
     __tablename__ = 'holiday'
     id = Column(Integer, unique=True, nullable=False, primary_key=True)
-    date = Column(DateTime)  # Дата поаздника
+    date = Column(DateTime, index=True)  # Дата поаздника
     name = Column(String(90), nullable=True)  # Наименование праздника
 
     def __repr__(self):
@@ -37,7 +37,7 @@ class Holiday(Base):
 
     FIELDS = {
         'id': int,
-        'date': alchemy.datetime_to_timestamp,
+        'date': alchemy.passby,
         'name': str,
     }
 
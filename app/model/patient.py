@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 
-from sqlalchemy import Column
+import re
+
+from sqlalchemy import Column, func, text
 from sqlalchemy import String, Integer
 
 from app.model import Base
 
+# Нормализованный ключ пациента (ФИО без регистра и крайних пробелов, цифры телефона),
+# совпадает с уникальным индексом ux_patient_identity и используется в ON CONFLICT
+IDENTITY_SQL = ("(lower(btrim(coalesce(last_name, '')))), (lower(btrim(coalesce(first_name, '')))), "
+                "(lower(btrim(coalesce(middle_name, '')))), (regexp_replace(coalesce(mobile, ''), '[^0-9]', '', 'g'))")
+
+# Наименьшая длина строки поиска: короче трехсимвольной триграммы индекс не используется
+SEARCH_MIN_LENGTH = 3
+
 
 # Модель пациенты
 class Patient(Base):
@@ -15,6 +25,14 @@ class Patient(Base):
     middle_name = Column(String(70), nullable=True)  # Отчество
     mobile = Column(String(80), nullable=True)  # Контактный номер мобильного телефона
 
+    # Пациент по нормализованному ключу: существующий или вновь добавленный
+    UPSERT_SQL = text("""
+        INSERT INTO patient (created, modified, last_name, first_name, middle_name, mobile)
+        VALUES (now(), now(), :last_name, :first_name, :middle_name, :mobile)
+        ON CONFLICT ({identity}) DO UPDATE SET modified = now()
+        RETURNING id
+    """.format(identity=IDENTITY_SQL))
+
     def __repr__(self):
         return "<Patient(last_name='%s', first_name='%s')>" % \
                (self.last_name, self.first_name)
@@ -23,6 +41,48 @@ class Patient(Base):
     def get_id(cls):
         return Patient.id
 
+    @classmethod
+    def upsert(cls, session, last_name, first_name=None, middle_name=None, mobile=None):
+        return session.execute(cls.UPSERT_SQL, {
+            'last_name': last_name,
+            'first_name': first_name,
+            'middle_name': middle_name,
+            'mobile': mobile,
+        }).scalar()
+
+    # Выражения поиска, совпадающие с индексами ix_patient_name_trgm и ix_patient_mobile_digits_trgm
+    @classmethod
+    def search_name(cls):
+        return func.lower(func.coalesce(cls.last_name, '') + ' ' + func.coalesce(cls.first_name, '') + ' ' +
+                          func.coalesce(cls.middle_name, ''))
+
+    @classmethod
+    def search_mobile(cls):
+        return func.regexp_replace(func.coalesce(cls.mobile, ''), '[^0-9]', '', 'g')
+
+    # Поиск пациентов по фрагменту ФИО или номеру телефона, лучшие совпадения первыми
+    @classmethod
+    def search(cls, session, q, limit):
+        q = q.strip().lower()
+        digits = re.sub(r'[^0-9]', '', q)
+        if digits and not re.search(r'[^0-9\s()+-]', q):
+            if len(digits) < SEARCH_MIN_LENGTH:
+                raise ValueError(q)
+            mobile = cls.search_mobile()
+            return session.query(cls).filter(mobile.like('%' + digits + '%')). \
+                order_by(func.length(mobile), cls.id).limit(limit).all()
+
+        words = q.split()
+        if not words or len(q) < SEARCH_MIN_LENGTH:
+            raise ValueError(q)
+        name = cls.search_name()
+        query = session.query(cls)
+        for word in words:
+            pattern = '%' + word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            query = query.filter(name.like(pattern, escape='\\'))
+        return query.order_by(func.word_similarity(q, name).desc(), func.similarity(q, name).desc(), cls.id). \
+            limit(limit).all()
+
     def get_full_name(self):
         return '%s %s %s' % (self.last_name, self.first_name, self.middle_name)
 
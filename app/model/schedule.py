@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
-from sqlalchemy import Column
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean
+from datetime import timedelta
+
+from sqlalchemy import Column, Index, text, not_
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, Date, Time
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert
 from app.utils import alchemy
 from sqlalchemy.orm import relationship
 
@@ -20,6 +23,13 @@ class Schedule(Base):
 
     doctor = relationship("Doctor", backref='schedule', primaryjoin="Schedule.doctor_id==Doctor.id")
 
+    __table_args__ = (
+        # Поиск свободных интервалов врача только по индексу (index-only scan)
+        Index('ix_schedule_doctor_free', 'doctor_id', 'date_start', 'date_end', 'id',
+              postgresql_where=text('NOT is_busy')),
+        Index('ix_schedule_doctor_busy', 'doctor_id', 'date_start', postgresql_where=text('is_busy')),
+    )
+
     def to_dict(self):
         obj = {
             "id": self.id,
@@ -30,20 +40,38 @@ class Schedule(Base):
         return obj
 
     def to_dict_reseption(self):
+        return self.slot_dict(self.id, self.date_start, self.date_end)
+
+    @staticmethod
+    def slot_dict(id, date_start, date_end):
         obj = {
-            "id": self.id,
-            "date_start": alchemy.datetime_to_timestamp(self.date_start) * 1000,
-            "date_end": alchemy.datetime_to_timestamp(self.date_end) * 1000,
+            "id": id,
+            "date_start": alchemy.datetime_to_timestamp(date_start) * 1000,
+            "date_end": alchemy.datetime_to_timestamp(date_end) * 1000,
         }
         return obj
 
+    # Свободные интервалы врача за период [date_from, date_to): кортежи (id, date_start, date_end)
+    @classmethod
+    def free_between(cls, session, doctor_id, date_from, date_to):
+        return session.query(cls.id, cls.date_start, cls.date_end).filter(
+            cls.doctor_id == doctor_id, cls.date_start >= date_from, cls.date_start < date_to,
+            not_(cls.is_busy)).order_by(cls.date_start).all()
+
+    # Начала занятых интервалов врача за период [date_from, date_to)
+    @classmethod
+    def busy_between(cls, session, doctor_id, date_from, date_to):
+        return [row[0] for row in session.query(cls.date_start).filter(
+            cls.doctor_id == doctor_id, cls.date_start >= date_from, cls.date_start < date_to,
+            cls.is_busy)]
+
     def __repr__(self):
         return '<Schedule {}>'.format(self.doctor_id)
 
     FIELDS = {
         'id': int,
-        'date_start': alchemy.datetime_to_timestamp,
-        'date_end': alchemy.datetime_to_timestamp,
+        'date_start': alchemy.passby,
+        'date_end': alchemy.passby,
         'creator_id': int,
         'doctor_id': int,
     }
@@ -52,6 +80,153 @@ class Schedule(Base):
 
 
 
+# Сводка по дням: количество свободных интервалов врача на день, обновляется при записи интервалов и приеме
+class ScheduleDay(Base):
+    __tablename__ = 'schedule_day'
+    doctor_id = Column(Integer, ForeignKey('doctor.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    free = Column(Integer, nullable=False, default=0)  # Свободных интервалов
+
+    def __repr__(self):
+        return '<ScheduleDay {} {} {}>'.format(self.doctor_id, self.day, self.free)
+
+    # Пересчет сводки врача за период [first_day, last_day] по источникам, counts - {дата: количество}:
+    # строки периода заменяются целиком, поэтому повторный пересчет не удваивает счетчики
+    @classmethod
+    def rebuild(cls, session, doctor_id, first_day, last_day, counts):
+        session.query(cls).filter(cls.doctor_id == doctor_id, cls.day >= first_day, cls.day <= last_day). \
+            delete(synchronize_session=False)
+        rows = [{'doctor_id': doctor_id, 'day': day, 'free': free} for day, free in counts.items() if free > 0]
+        if rows:
+            session.execute(insert(cls.__table__).values(rows))
+
+    # Врачи, у которых на день day есть интервалы, правила или строки сводки
+    @classmethod
+    def doctors_on(cls, session, day):
+        next_day = day + timedelta(days=1)
+        doctors = session.query(cls.doctor_id).filter(cls.day == day). \
+            union(session.query(ScheduleRule.doctor_id).filter(ScheduleRule.date_from <= day,
+                                                               ScheduleRule.date_to >= day)). \
+            union(session.query(Schedule.doctor_id).filter(Schedule.date_start >= day,
+                                                           Schedule.date_start < next_day))
+        return [row[0] for row in doctors if row[0] is not None]
+
+    # Дни, начиная с day, в которые у врача есть свободные интервалы
+    @classmethod
+    def free_days(cls, session, doctor_id, day):
+        return [row[0] for row in session.query(cls.day).filter(
+            cls.doctor_id == doctor_id, cls.day >= day, cls.free > 0).order_by(cls.day)]
+
+    FIELDS = {
+        'doctor_id': int,
+        'day': alchemy.passby,
+        'free': int,
+    }
+
+    FIELDS.update(Base.FIELDS)
+
+# Правило расписания врача: интервалы приема вычисляются по запросу и не хранятся построчно
+class ScheduleRule(Base):
+    __tablename__ = 'schedule_rule'
+    id = Column(Integer, unique=True, nullable=False, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey('doctor.id'), nullable=False)
+    creator_id = Column(Integer, ForeignKey('user.id'))
+    weekdays = Column(Integer, nullable=False)  # Битовая маска дней недели, 1 << 0 - понедельник
+    time_start = Column(Time, nullable=False)  # Начало приема
+    time_end = Column(Time, nullable=False)  # Окончание приема
+    interval = Column(Integer, nullable=False)  # Длительность приема, в минутах
+    date_from = Column(Date, nullable=False)  # Начало действия правила
+    date_to = Column(Date, nullable=False)  # Окончание действия правила (включительно)
+    exceptions = Column(ARRAY(Date), nullable=True)  # Дни без приема, помимо праздничных
+
+    doctor = relationship("Doctor", primaryjoin="ScheduleRule.doctor_id==Doctor.id")
+
+    __table_args__ = (
+        Index('ix_schedule_rule_doctor_period', 'doctor_id', 'date_from', 'date_to'),
+    )
+
+    def __repr__(self):
+        return '<ScheduleRule {} {}-{}>'.format(self.doctor_id, self.date_from, self.date_to)
+
+    @classmethod
+    def get_id(cls):
+        return ScheduleRule.id
+
+    @classmethod
+    def find_active(cls, session, doctor_id, date_from, date_to):
+        return session.query(cls).filter(cls.doctor_id == doctor_id, cls.date_from <= date_to,
+                                         cls.date_to >= date_from).all()
+
+    @staticmethod
+    def slot_dict(rule_id, date_start, date_end):
+        obj = {
+            "id": None,
+            "rule_id": rule_id,
+            "date_start": alchemy.datetime_to_timestamp(date_start) * 1000,
+            "date_end": alchemy.datetime_to_timestamp(date_end) * 1000,
+        }
+        return obj
+
+    FIELDS = {
+        'id': int,
+        'doctor_id': int,
+        'creator_id': int,
+        'weekdays': int,
+        'interval': int,
+        'date_from': alchemy.passby,
+        'date_to': alchemy.passby,
+    }
+
+    FIELDS.update(Base.FIELDS)
+
+
+# Фоновая задача построчного формирования расписания
+class ScheduleJob(Base):
+    __tablename__ = 'schedule_job'
+    id = Column(Integer, unique=True, nullable=False, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey('doctor.id'), nullable=False)
+    creator_id = Column(Integer, ForeignKey('user.id'))
+    status = Column(String(20), nullable=False, default='pending')  # pending, running, done, failed
+    params = Column(JSONB, nullable=False)  # Параметры запроса на формирование расписания
+    total = Column(Integer, nullable=True)  # Всего интервалов
+    count = Column(Integer, nullable=False, default=0)  # Записано интервалов
+    error = Column(String(500), nullable=True)
+    started = Column(DateTime, nullable=True)
+    finished = Column(DateTime, nullable=True)
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __repr__(self):
+        return '<ScheduleJob {} {}>'.format(self.id, self.status)
+
+    @classmethod
+    def get_id(cls):
+        return ScheduleJob.id
 
-#
+    def to_dict(self):
+        obj = {
+            "id": self.id,
+            "status": self.status,
+            "doctor_id": self.doctor_id,
+            "total": self.total,
+            "count": self.count,
+            "progress": round(self.count * 100.0 / self.total, 1) if self.total else 0,
+            "error": self.error,
+            "elapsed": round((self.finished - self.started).total_seconds(), 3)
+            if self.started and self.finished else None,
+        }
+        return obj
 
+    FIELDS = {
+        'id': int,
+        'doctor_id': int,
+        'creator_id': int,
+        'status': str,
+        'total': int,
+        'count': int,
+    }
+
+    FIELDS.update(Base.FIELDS)
@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 
-from sqlalchemy import Column
+from sqlalchemy import Column, text
 from sqlalchemy import Integer, ForeignKey, String
 from sqlalchemy_utils import ChoiceType
 from sqlalchemy.orm import relationship
 
 from app.model import Base
+from app.model.doctor import Doctor
+from app.model.patient import Patient, IDENTITY_SQL
+from app.model.schedule import Schedule
+from app.model.user import User
 from enum import Enum
 
 
@@ -34,17 +38,91 @@ class Visit(Base):
     doctor = relationship("Doctor")
     patient = relationship("Patient")
 
+    # Запись на прием одним запросом: интервал занимается только если он свободен,
+    # пациент (существующий по нормализованному ключу или новый), визит и сводка по дням
+    # изменяются только при успешном занятии интервала
+    BOOK_SQL = text("""
+        WITH claimed AS (
+            UPDATE schedule SET is_busy = true, modified = now()
+            WHERE id = :schedule_id AND NOT is_busy
+            RETURNING id, doctor_id, date_start
+        ), patient_row AS (
+            INSERT INTO patient (created, modified, last_name, first_name, middle_name, mobile)
+            SELECT now(), now(), :last_name, :first_name, :middle_name, :mobile
+            WHERE EXISTS (SELECT 1 FROM claimed)
+            ON CONFLICT ({identity}) DO UPDATE SET modified = now()
+            RETURNING id
+        ), visit_row AS (
+            INSERT INTO visit (created, modified, creator_id, schedule_id, patient_id, doctor_id,
+                               source_of_financing, comment)
+            SELECT now(), now(), :creator_id, claimed.id, patient_row.id, claimed.doctor_id,
+                   :source_of_financing, :comment
+            FROM claimed, patient_row
+            RETURNING id
+        ), day_row AS (
+            UPDATE schedule_day SET free = free - 1, modified = now()
+            FROM claimed
+            WHERE schedule_day.doctor_id = claimed.doctor_id AND schedule_day.day = claimed.date_start::date
+        )
+        SELECT id FROM visit_row
+    """.format(identity=IDENTITY_SQL))
+
     def __repr__(self):
         return "<Visit(id='%d')>" % (self.id)
 
+    # Возвращает идентификатор визита, либо None если интервал уже занят
+    @classmethod
+    def book(cls, session, schedule_id, patient, creator_id, source_of_financing=None, comment=None):
+        row = session.execute(cls.BOOK_SQL, {
+            'schedule_id': schedule_id,
+            'last_name': patient['last_name'],
+            'first_name': patient['first_name'],
+            'middle_name': patient['middle_name'],
+            'mobile': patient['mobile'],
+            'creator_id': creator_id,
+            'source_of_financing': source_of_financing,
+            'comment': comment,
+        }).first()
+        return row[0] if row else None
+
     def to_dict(self):
+        return self.calendar_item((
+            self.id, self.source_of_financing,
+            self.patient.last_name, self.patient.first_name, self.patient.middle_name, self.patient.mobile,
+            self.doctor.user.last_name, self.doctor.user.first_name, self.doctor.user.middle_name,
+            self.doctor.color, self.schedule.date_start, self.schedule.date_end,
+        ))
+
+    # Визиты за период одним запросом: только столбцы, необходимые для календаря
+    @classmethod
+    def calendar_query(cls, session, date_start, date_end):
+        return session.query(
+            cls.id, cls.source_of_financing,
+            Patient.last_name, Patient.first_name, Patient.middle_name, Patient.mobile,
+            User.last_name, User.first_name, User.middle_name,
+            Doctor.color, Schedule.date_start, Schedule.date_end,
+        ).join(Schedule, cls.schedule_id == Schedule.id). \
+            join(Patient, cls.patient_id == Patient.id). \
+            join(Doctor, cls.doctor_id == Doctor.id). \
+            join(User, Doctor.user_id == User.id). \
+            filter(Schedule.date_start >= date_start, Schedule.date_end <= date_end)
+
+    # Событие календаря (FullCalendar) из строки calendar_query
+    @staticmethod
+    def calendar_item(row):
+        (id, source_of_financing, last_name, first_name, middle_name, mobile,
+         doctor_last_name, doctor_first_name, doctor_middle_name, color, date_start, date_end) = row
+        # Источник финансирования не обязателен при записи
+        financing = source_of_financing.label if source_of_financing is not None else ''
         obj = {
-            'id': self.id,
-            'title': '   ' + str(self.source_of_financing.label) + '     Пациент:  ' + self.patient.get_full_name() + '   Тел: ' + self.patient.mobile + ' Врач: ' + self.doctor.get_short_name(),
-            'start': f'{self.schedule.date_start:%Y-%m-%d %H:%M}',
-            'end': f'{self.schedule.date_end:%Y-%m-%d %H:%M}',
-            'backgroundColor': self.doctor.color,
-            'borderColor': self.doctor.color,
+            'id': id,
+            'title': '   ' + str(financing) + '     Пациент:  ' +
+                     '%s %s %s' % (last_name, first_name, middle_name) + '   Тел: ' + mobile +
+                     ' Врач: ' + '%s %s. %s.' % (doctor_last_name, doctor_first_name[0], doctor_middle_name[0]),
+            'start': f'{date_start:%Y-%m-%d %H:%M}',
+            'end': f'{date_end:%Y-%m-%d %H:%M}',
+            'backgroundColor': color,
+            'borderColor': color,
         }
         return obj
 
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+from celery import Celery
+from sqlalchemy.orm import Session
+
+from app import log
+from app import config
+from app.database import engine
+from app.model.schedule import ScheduleJob
+from app.utils import calendar_shedule
+
+LOG = log.get_logger()
+
+# Количество интервалов, записываемых и фиксируемых за один шаг задачи
+JOB_CHUNK_SIZE = 5000
+
+celery = Celery('app', broker=config.CELERY_BROKER_URL)
+celery.conf.task_always_eager = config.CELERY_ALWAYS_EAGER
+
+
+# Построчное формирование расписания частями, с фиксацией прогресса после каждой части
+@celery.task(name='schedule.generate')
+def generate_schedule(job_id):
+    session = Session(bind=engine)
+    try:
+        job = ScheduleJob.find_one(session, job_id)
+        job.status = ScheduleJob.RUNNING
+        job.started = datetime.datetime.now()
+        session.commit()
+
+        params = job.params
+        first_day, last_day = calendar_shedule.period(params['date_start'], params.get('date_end'))
+        starts, ends = calendar_shedule.generate_plan(
+            start_date=params['date_start'], end_date=params.get('date_end'),
+            holidays_list=calendar_shedule.holidays_between(session, first_day, last_day),
+            workdays_list=params['workdays'], start_time=params['start_time'], end_time=params['end_time'],
+            interval=params['interval'])
+        job.total = len(starts)
+        session.commit()
+
+        for i in range(0, len(starts), JOB_CHUNK_SIZE):
+            calendar_shedule.insert_slots(session, starts[i:i + JOB_CHUNK_SIZE], ends[i:i + JOB_CHUNK_SIZE],
+                                          job.doctor_id, job.creator_id)
+            job.count = min(i + JOB_CHUNK_SIZE, len(starts))
+            session.commit()
+
+        job.status = ScheduleJob.DONE
+        job.finished = datetime.datetime.now()
+        session.commit()
+    except Exception as ex:
+        LOG.exception('Schedule job %s failed', job_id)
+        session.rollback()
+        ScheduleJob.find_update(session, job_id, {
+            'status': ScheduleJob.FAILED,
+            'error': str(ex)[:500],
+            'finished': datetime.datetime.now()
+        })
+        session.commit()
+    finally:
+        session.close()
+
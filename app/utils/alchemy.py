@@ -1,33 +1,57 @@
 # -*- coding: utf-8 -*-
 
-import json
 import time
 import datetime
 
+from sqlalchemy import inspect, select, and_
 from sqlalchemy.ext.declarative import DeclarativeMeta
 
 
-def new_alchemy_encoder():
-    # http://stackoverflow.com/questions/5022066/how-to-serialize-sqlalchemy-result-to-json
-    _visited_objs = []
+# Преобразование графа объектов ORM в словари и списки для кодировщика ответа.
+# Циклы отсекаются по множеству id объектов на текущем пути, связи раскрываются
+# не глубже depth, выгружаются только уже загруженные атрибуты (без ленивых запросов).
+# fields - белый список полей по классу модели: {Doctor: ('id', 'user')}
+def to_primitive(obj, depth=1, fields=None):
+    fields = fields or {}
+    path = set()
 
-    class AlchemyEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj.__class__, DeclarativeMeta):
-                # don't re-visit self
-                if obj in _visited_objs:
-                    return None
-                _visited_objs.append(obj)
+    def walk(value, level):
+        if isinstance(value.__class__, DeclarativeMeta):
+            key = id(value)
+            if key in path:
+                return None
+            path.add(key)
+            try:
+                return convert(value, level)
+            finally:
+                path.discard(key)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return [walk(item, level) for item in value]
+        if isinstance(value, dict):
+            return {key: walk(item, level) for key, item in value.items()}
+        return value
 
-                # an SQLAlchemy class
-                fields = {}
-                for field in [x for x in dir(obj) if not x.startswith('_') and x != 'metadata']:
-                    fields[field] = obj.__getattribute__(field)
-                # a json-encodable dict
-                return fields
+    def convert(value, level):
+        state = inspect(value)
+        mapper = state.mapper
+        names = fields.get(mapper.class_)
+        unloaded = state.unloaded
+        loaded = state.dict
+        result = {}
+        for attr in mapper.column_attrs:
+            key = attr.key
+            if key in unloaded or (names is not None and key not in names):
+                continue
+            result[key] = loaded.get(key)
+        if level > 0:
+            for rel in mapper.relationships:
+                key = rel.key
+                if key in unloaded or (names is not None and key not in names):
+                    continue
+                result[key] = walk(loaded.get(key), level - 1)
+        return result
 
-            return json.JSONEncoder.default(self, obj)
-    return AlchemyEncoder
+    return walk(obj, depth)
 
 
 def passby(data):
@@ -38,4 +62,19 @@ def datetime_to_timestamp(date):
     if isinstance(date, datetime.date):
         return int(time.mktime(date.timetuple()))
     else:
-        return None
\ No newline at end of file
+        return None
+
+# Приведение строк таблицы связей владельца к набору target_ids: разность множеств,
+# одна массовая вставка и одно массовое удаление. Возвращает (добавленные, удаленные)
+def sync_association(session, table, owner_key, owner_id, target_key, target_ids):
+    owner = table.c[owner_key]
+    target = table.c[target_key]
+    current = {row[0] for row in session.execute(select([target]).where(owner == owner_id))}
+    wanted = set(target_ids)
+    added = wanted - current
+    removed = current - wanted
+    if removed:
+        session.execute(table.delete().where(and_(owner == owner_id, target.in_(removed))))
+    if added:
+        session.execute(table.insert().values([{owner_key: owner_id, target_key: key} for key in sorted(added)]))
+    return added, removed
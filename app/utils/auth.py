@@ -1,16 +1,46 @@
 # -*- coding: utf-8 -*-
 
+import hmac
+import time
 import bcrypt
+import hashlib
+import threading
 import shortuuid
 
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
 from itsdangerous import TimestampSigner
 from itsdangerous import SignatureExpired, BadSignature
 from cryptography.fernet import Fernet, InvalidToken
 
+from app import config
 from app.config import SECRET_KEY, TOKEN_EXPIRES, UUID_LEN, UUID_ALPHABET
+from app.errors import ServiceUnavailableError
+from app.utils.cache import LRUCache
 
 app_secret_key = Fernet(SECRET_KEY)
 
+TOKEN_CACHE_SIZE = 8192
+TOKEN_CACHE_TTL = 600
+
+# Расшифрованные токены: sha256 токена -> numeric_id пользователя
+_tokens = LRUCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+# Пул процессов bcrypt создается при первом обращении, уже в процессе воркера gunicorn
+_hash_pool = None
+_hash_lock = threading.Lock()
+# Выполняемые и ожидающие в очереди запросы на хеширование
+_hash_slots = threading.BoundedSemaphore(max(config.HASH_WORKERS, 1) + config.HASH_QUEUE_LIMIT)
+_hash_metrics = {
+    'queue_depth': 0,
+    'completed': 0,
+    'rejected': 0,
+    'timed_out': 0,
+    'failed': 0,
+    'latency_total': 0.0,
+    'latency_max': 0.0,
+}
+
 
 def get_common_key():
     return app_secret_key
@@ -33,12 +63,113 @@ def decrypt_token(token):
         return None
 
 
+def _token_key(token):
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+# numeric_id пользователя из токена, с кэшированием результата расшифровки
+def decode_token(token):
+    key = _token_key(token)
+    numeric_id = _tokens.get(key)
+    if numeric_id is None:
+        data = decrypt_token(token)
+        if data is None:
+            return None
+        numeric_id = data.decode('utf-8')
+        _tokens.set(key, numeric_id)
+    return numeric_id
+
+
+# Сброс из кэша расшифрованных токенов. Токен - постоянный секрет пользователя (User.token),
+# поэтому сброс не отзывает его: доступ закрывается блокировкой или удалением пользователя
+def evict_token(token):
+    _tokens.pop(_token_key(token))
+
+
+def evict_numeric_id(numeric_id):
+    _tokens.invalidate(lambda key, value: value == numeric_id)
+
+
+def token_cache_stats():
+    return _tokens.stats()
+
+
+def _executor():
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(max_workers=config.HASH_WORKERS)
+    return _hash_pool
+
+
+# Слот освобождается по завершении хеширования: задача, ожидание которой прервано по таймауту,
+# продолжает занимать процесс пула до конца вычисления
+def _release_slot(future=None):
+    _hash_slots.release()
+    with _hash_lock:
+        _hash_metrics['queue_depth'] -= 1
+
+
+def _count(name, latency=None):
+    with _hash_lock:
+        _hash_metrics[name] += 1
+        if latency is not None:
+            _hash_metrics['latency_total'] += latency
+            _hash_metrics['latency_max'] = max(_hash_metrics['latency_max'], latency)
+
+
+def _compute(password, salt):
+    if config.HASH_WORKERS > 0:
+        try:
+            future = _executor().submit(bcrypt.hashpw, password, salt)
+        except Exception:
+            _release_slot()
+            raise
+        future.add_done_callback(_release_slot)
+        return future.result(timeout=config.HASH_TIMEOUT)
+    try:
+        return bcrypt.hashpw(password, salt)
+    finally:
+        _release_slot()
+
+
+# Хеширование в пуле процессов; при переполнении очереди и по таймауту - ошибка 503.
+# Время хеширования учитывается только для успешных вычислений
+def _hashpw(password, salt):
+    if not _hash_slots.acquire(blocking=False):
+        _count('rejected')
+        raise ServiceUnavailableError('Password hashing queue is full')
+    with _hash_lock:
+        _hash_metrics['queue_depth'] += 1
+    started = time.monotonic()
+    try:
+        hashed = _compute(password, salt)
+    except TimeoutError:
+        _count('timed_out')
+        raise ServiceUnavailableError('Password hashing timed out')
+    except Exception:
+        _count('failed')
+        raise
+    _count('completed', time.monotonic() - started)
+    return hashed
+
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return _hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS))
 
 
 def verify_password(password, hashed):
-    return bcrypt.hashpw(password.encode('utf-8'), hashed) == hashed
+    return hmac.compare_digest(_hashpw(password.encode('utf-8'), hashed), hashed)
+
+
+def hash_pool_stats():
+    with _hash_lock:
+        stats = dict(_hash_metrics)
+    stats['workers'] = config.HASH_WORKERS
+    stats['queue_limit'] = config.HASH_QUEUE_LIMIT
+    stats['latency_avg'] = stats['latency_total'] / stats['completed'] if stats['completed'] else 0.0
+    return stats
 
 
 def generate_timed_token(user_dict, expiration=TOKEN_EXPIRES):
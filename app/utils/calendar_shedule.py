@@ -1,70 +1,164 @@
 # -*- coding: utf-8 -*-
 
-from business_calendar import Calendar, MO, TU, WE, TH, FR
 import datetime
+from array import array
+from collections import Counter
 
-from app.model.schedule import Schedule
+from app.model.schedule import Schedule, ScheduleRule, ScheduleDay
+from app.utils.holidays import HolidayCalendar, get_calendar
+
+# Порядковый номер дня начала эпохи, от него считаются секунды в массивах интервалов
+EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+SECONDS_IN_DAY = 86400
+
+WEEKDAYS = {
+    'MO': 0,
+    'TU': 1,
+    'WE': 2,
+    'TH': 3,
+    'FR': 4,
+    'SA': 5,
+    'SU': 6,
+}
+DEFAULT_WORKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR']
 
 
 def f_workday(x):
     try:
-        return {
-            'MO': MO,
-            'TU': TU,
-            'WE': WE,
-            'TH': TH,
-            'FR': FR,
-        }[x]
+        return WEEKDAYS[x]
     except KeyError:
-        print('KeyError')
+        raise ValueError('unknown workday: %s' % x)
 
 
-# Преобразование списка рабочих дней
-def _workdays(workdays=[]):
-    list_wordays = []
-    if workdays:
-        for day in workdays:
-            list_wordays.append(f_workday(day))
-        return list_wordays
-    else:
-        return [MO, TU, WE, TH, FR]
+# Преобразование списка рабочих дней в битовую маску дней недели
+def workdays_mask(workdays=[]):
+    mask = 0
+    for day in workdays or DEFAULT_WORKDAYS:
+        mask |= 1 << f_workday(day)
+    return mask
 
 
-# Получение списка праздничных дней
+# Получение списка праздничных дней (порядковые номера дат)
 def _holidays(days=[]):
-    if not days:
-        return []
+    if isinstance(days, HolidayCalendar):
+        return days
+    ordinals = set()
+    for day in days or []:
+        # Строки запроса session.query(Holiday.date)
+        if isinstance(day, tuple):
+            day = day[0]
+        if isinstance(day, (datetime.date, datetime.datetime)):
+            ordinals.add(day.toordinal())
+        elif isinstance(day, int):
+            ordinals.add(day)
+    return ordinals
+
+
+# Праздничные дни периода [first_day, last_day] из кэша календарей
+def holidays_between(session, first_day, last_day):
+    return get_calendar(session, first_day, last_day)
+
+
+# Маска рабочих дней периода: 1 - рабочий день, 0 - выходной или праздник
+def day_mask(first_ordinal, days, weekday_mask, holidays=()):
+    mask = array('B', bytes(days))
+    for i in range(days):
+        ordinal = first_ordinal + i
+        # date.fromordinal(1) - понедельник
+        if weekday_mask >> ((ordinal - 1) % 7) & 1 and ordinal not in holidays:
+            mask[i] = 1
+    return mask
+
+
+# Смещения начала интервалов от полуночи, в секундах
+def slot_offsets(start_time, end_time, interval):
+    start = (start_time.hour * 60 + start_time.minute) * 60
+    end = (end_time.hour * 60 + end_time.minute) * 60
+    step = interval * 60
+    return array('l', range(start, end, step))
+
+
+# Планирование интервалов: сетка (день x смещение) в виде массивов секунд от EPOCH
+def plan(first_ordinal, days, weekday_mask, holidays, offsets, interval):
+    mask = day_mask(first_ordinal, days, weekday_mask, holidays)
+    starts = array('q')
+    for i in range(days):
+        if mask[i]:
+            starts.extend(map(((first_ordinal + i - EPOCH_ORDINAL) * SECONDS_IN_DAY).__add__, offsets))
+    ends = array('q', map((interval * 60).__add__, starts))
+    return starts, ends
+
+
+def to_datetime(seconds):
+    return EPOCH + datetime.timedelta(seconds=seconds)
+
+
+def to_seconds(date):
+    return int((date - EPOCH).total_seconds())
 
 
 # Один день, временной интервал(для создания расписания)
-def schedule(date_start, date_end, interval, doctor, creator, session):
-    while date_start < date_end:
-        date_start_i = date_start
-        date_start += datetime.timedelta(minutes=interval)
-        print('{0} {1}'.format(date_start_i.strftime("%Y-%m-%d %H:%M:%S"), date_start.strftime("%Y-%m-%d %H:%M:%S")))
+def schedule(starts, ends, doctor, creator):
+    return [{
+        'date_start': to_datetime(date_start),
+        'date_end': to_datetime(date_end),
+        'doctor_id': doctor,
+        'creator_id': creator,
+        'is_busy': False,
+    } for date_start, date_end in zip(starts, ends)]
+
+
+# Количество интервалов по дням: {дата: количество}
+def day_counts(starts):
+    return {datetime.date.fromordinal(EPOCH_ORDINAL + day): count
+            for day, count in Counter(start // SECONDS_IN_DAY for start in starts).items()}
+
+
+# Запись части сетки интервалов одним INSERT ... VALUES и пересчет сводки по ее дням, без фиксации транзакции
+def insert_slots(session, starts, ends, doctor, creator):
+    if len(starts):
+        session.execute(Schedule.__table__.insert().values(schedule(starts, ends, doctor, creator)))
+        refresh_days(session, doctor, to_datetime(starts[0]).date(), to_datetime(starts[-1]).date())
+    return len(starts)
 
-        schedule = Schedule(date_start=date_start_i, date_end=date_start, doctor_id=doctor, creator_id=creator)
-        session.add(schedule)
 
-    session.commit()
+# Свободные интервалы врача по дням за период [first_day, last_day]: свободные строки schedule
+# и интервалы правил без занятых и праздничных, одинаковое время начала учитывается один раз
+def free_counts(session, doctor_id, first_day, last_day):
+    date_from = datetime.datetime.combine(first_day, datetime.time())
+    date_to = datetime.datetime.combine(last_day + datetime.timedelta(days=1), datetime.time())
+    holidays = holidays_between(session, first_day, last_day)
+    busy = [to_seconds(date) for date in Schedule.busy_between(session, doctor_id, date_from, date_to)]
+    starts = {to_seconds(row[1]) for row in Schedule.free_between(session, doctor_id, date_from, date_to)}
+    rules = ScheduleRule.find_active(session, doctor_id, first_day, last_day)
+    starts.update(slot[1] for slot in free_slots(rules, first_day, last_day, holidays, busy))
+    return day_counts(start for start in starts if EPOCH_ORDINAL + start // SECONDS_IN_DAY not in holidays)
 
 
-# Создание полного списка и запись в БД
-def generate(start_date=None, end_date=None, holidays_list=[], workdays_list=[],
-             start_time='', end_time='', interval=0, doctor=None, creator=None, session=None):
-    # Если дата одна, поставляем дату окончания сегодня
-    if not end_date:
-        # Дата окончания периода + 1 день(сутки)
-        end_date = datetime.datetime.strptime(start_date, "%d.%m.%Y") + datetime.timedelta(days=1)
+# Пересчет сводки schedule_day врача за период по источникам
+def refresh_days(session, doctor_id, first_day, last_day):
+    ScheduleDay.rebuild(session, doctor_id, first_day, last_day,
+                        free_counts(session, doctor_id, first_day, last_day))
 
-    # Дата начала периода
+
+# Пересчет сводки за день всех врачей, у которых на этот день есть расписание (изменение праздников)
+def refresh_day(session, day):
+    for doctor_id in ScheduleDay.doctors_on(session, day):
+        refresh_days(session, doctor_id, day, day)
+
+
+# Период запроса [первый день, последний день]
+def period(start_date=None, end_date=None):
     start_date = datetime.datetime.strptime(start_date, '%d.%m.%Y')
+    end_date = datetime.datetime.strptime(end_date, "%d.%m.%Y") if end_date else start_date
+    return start_date, end_date
 
-    # Праздничные дни
-    holidays = _holidays(holidays_list)
 
-    # Список рабочих дней
-    workdays = _workdays(workdays_list)
+# Разбор параметров запроса: период, время приема и интервал
+def parse_params(start_date, end_date, start_time, end_time, interval):
+    # Если дата одна, период состоит из одного дня, иначе дата окончания входит в период
+    start_date, end_date = period(start_date, end_date)
 
     # Время начала работы
     start_time = datetime.datetime.strptime(start_time, '%H:%M')
@@ -73,19 +167,89 @@ def generate(start_date=None, end_date=None, holidays_list=[], workdays_list=[],
 
     # Интервал приема
     interval = int(interval)
-
-    # Объявление экземпляра класса календарь
-    cal = Calendar(workdays=workdays, holidays=holidays)
-
-    for x in cal.range(start_date, end_date):
-        schedule(x + datetime.timedelta(hours=start_time.hour, minutes=start_time.minute),
-                 x + datetime.timedelta(hours=end_time.hour, minutes=end_time.minute),
-                 interval=interval,
-                 doctor=doctor,
-                 creator=creator,
-                 session=session)
+    if interval <= 0:
+        raise ValueError('interval must be positive')
+    return start_date, end_date, start_time, end_time, interval
+
+
+# Проверка параметров запроса на формирование расписания без построения сетки, ValueError при ошибке
+def validate_params(start_date=None, end_date=None, workdays_list=[], start_time='', end_time='', interval=0):
+    parse_params(start_date, end_date, start_time, end_time, interval)
+    workdays_mask(workdays_list)
+
+
+# Разбор параметров запроса в сетку интервалов
+def generate_plan(start_date=None, end_date=None, holidays_list=[], workdays_list=[],
+                  start_time='', end_time='', interval=0):
+    start_date, end_date, start_time, end_time, interval = parse_params(start_date, end_date, start_time, end_time,
+                                                                  interval)
+    first_ordinal = start_date.toordinal()
+    days = max(end_date.toordinal() - first_ordinal + 1, 0)
+    return plan(first_ordinal, days, workdays_mask(workdays_list), _holidays(holidays_list),
+                slot_offsets(start_time, end_time, interval), interval)
+
+
+# Создание правила расписания вместо построчной записи интервалов
+def generate_rule(start_date=None, end_date=None, workdays_list=[], start_time='', end_time='', interval=0,
+                  exceptions=None, doctor=None, creator=None):
+    start_date, end_date, start_time, end_time, interval = parse_params(start_date, end_date, start_time, end_time,
+                                                                  interval)
+    if end_date < start_date:
+        raise ValueError('end date is before start date')
+    rule = ScheduleRule()
+    rule.doctor_id = doctor
+    rule.creator_id = creator
+    rule.weekdays = workdays_mask(workdays_list)
+    rule.time_start = start_time.time()
+    rule.time_end = end_time.time()
+    rule.interval = interval
+    rule.date_from = start_date.date()
+    rule.date_to = end_date.date()
+    rule.exceptions = [datetime.datetime.strptime(day, '%d.%m.%Y').date() for day in exceptions or []]
+    return rule
+
+
+# Интервалы правила за период [first_day, last_day], holidays - порядковые номера праздничных дней
+def rule_plan(rule, first_day, last_day, holidays=()):
+    first = max(first_day.toordinal(), rule.date_from.toordinal())
+    last = min(last_day.toordinal(), rule.date_to.toordinal())
+    if last < first:
+        return array('q'), array('q')
+    excluded = holidays
+    if rule.exceptions:
+        excluded = set(holidays)
+        excluded.update(day.toordinal() for day in rule.exceptions)
+    return plan(first, last - first + 1, rule.weekdays, excluded,
+                slot_offsets(rule.time_start, rule.time_end, rule.interval), rule.interval)
+
+
+# Свободные интервалы правил за период: (rule_id, начало, окончание) в секундах от EPOCH.
+# Интервал с одним временем начала из пересекающихся правил выдается один раз, от правила с меньшим id
+def free_slots(rules, first_day, last_day, holidays=(), busy=()):
+    busy = set(busy)
+    slots = {}
+    for rule in sorted(rules, key=lambda rule: rule.id):
+        starts, ends = rule_plan(rule, first_day, last_day, holidays)
+        for date_start, date_end in zip(starts, ends):
+            if date_start not in busy and date_start not in slots:
+                slots[date_start] = (rule.id, date_start, date_end)
+    return [slots[date_start] for date_start in sorted(slots)]
+
+
+# Проверка, что интервал с началом date_start порождается правилом
+def rule_contains(rule, date_start, holidays=()):
+    starts, ends = rule_plan(rule, date_start.date(), date_start.date(), holidays)
+    seconds = to_seconds(date_start)
+    for slot_start, slot_end in zip(starts, ends):
+        if slot_start == seconds:
+            return to_datetime(slot_end)
+    return None
 
 
 if __name__ == "__main__":
-    generate(start_date='3.04.2019')
-    # func worksdays = true
+    import time
+
+    started = time.monotonic()
+    starts, _ = generate_plan(start_date='01.01.2019', end_date='31.12.2019',
+                              start_time='08:00', end_time='20:00', interval=15)
+    print('%d slots in %.3f ms' % (len(starts), (time.monotonic() - started) * 1000))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import datetime
+import decimal
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+# Типы, которые не кодируются напрямую: даты выводятся меткой времени в секундах,
+# как alchemy.datetime_to_timestamp
+def default(obj):
+    if isinstance(obj, datetime.date):
+        return int(time.mktime(obj.timetuple()))
+    if isinstance(obj, datetime.time):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=default,
+                        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+
+def _ujson_dumps(obj):
+    return ujson.dumps(obj, ensure_ascii=False, default=default).encode('utf-8')
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=default).encode('utf-8')
+
+
+# Старые версии ujson не поддерживают default и сами кодируют datetime иначе
+def _ujson_supported():
+    try:
+        return _ujson_dumps(datetime.date(1970, 1, 2)) == _json_dumps(datetime.date(1970, 1, 2))
+    except TypeError:
+        return False
+
+
+if orjson is not None:
+    BACKEND, dumps = 'orjson', _orjson_dumps
+elif ujson is not None and _ujson_supported():
+    BACKEND, dumps = 'ujson', _ujson_dumps
+else:
+    BACKEND, dumps = 'json', _json_dumps
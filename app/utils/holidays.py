@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+from array import array
+from bisect import bisect_left
+
+from app.model.holiday import Holiday
+from app.utils.cache import LRUCache
+
+# Время жизни календаря в кэше: изменения в других процессах видны не позже чем через это время
+HOLIDAY_CACHE_TTL = 300
+
+_calendars = LRUCache(maxsize=16, ttl=HOLIDAY_CACHE_TTL)
+
+
+class HolidayCalendar(object):
+    """
+    Праздничные дни периода в виде отсортированного массива порядковых номеров дат.
+    Проверка вхождения - бинарный поиск.
+    """
+
+    def __init__(self, first_day, last_day, days=()):
+        self.first_day = first_day
+        self.last_day = last_day
+        self.ordinals = array('l', sorted({day.toordinal() for day in days}))
+
+    def __contains__(self, day):
+        ordinal = day if isinstance(day, int) else day.toordinal()
+        i = bisect_left(self.ordinals, ordinal)
+        return i < len(self.ordinals) and self.ordinals[i] == ordinal
+
+    def __iter__(self):
+        return iter(self.ordinals)
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def dates(self):
+        return [datetime.date.fromordinal(ordinal) for ordinal in self.ordinals]
+
+
+def _load(session, first_day, last_day):
+    holidays_dbs = session.query(Holiday.date).filter(
+        Holiday.date >= first_day, Holiday.date < last_day + datetime.timedelta(days=1)).all()
+    return HolidayCalendar(first_day, last_day, [holiday[0] for holiday in holidays_dbs])
+
+
+# Календарь праздничных дней, покрывающий период [first_day, last_day] целыми годами
+def get_calendar(session, first_day, last_day):
+    key = (first_day.year, last_day.year)
+    return _calendars.get_or_load(key, lambda: _load(session, datetime.datetime(first_day.year, 1, 1),
+                                                     datetime.datetime(last_day.year, 12, 31)))
+
+
+# Сброс кэша при изменении праздничных дней
+def invalidate():
+    _calendars.clear()
+
+
+def stats():
+    return _calendars.stats()
@@ -2,22 +2,33 @@
 
 import falcon
 from app.errors import UnauthorizedError
-from app.model.user import User
+from app.utils.principal import get_principal
 
 
-def auth_required(req, res, resource, params):
-    if req.context['auth_user']:
-        session = req.context['session']
-        user = User.find_by_numeric_id(session, req.context['auth_user'])
-        req.context['user'] = user.id
+# Пользователь запроса; заблокированный пользователь не авторизуется, даже если токен действителен
+def _principal(req):
+    if 'principal' in req.context:
+        principal = req.context['principal']
+    elif req.context['auth_user']:
+        principal = get_principal(req.context['session'], req.context['auth_user'])
+        req.context['principal'] = principal
     else:
+        principal = None
+    if principal is None:
         raise UnauthorizedError()
+    if principal.blocked:
+        raise UnauthorizedError('User is blocked')
+    return principal
+
+
+def auth_required(req, res, resource, params):
+    principal = _principal(req)
+    req.context['user'] = principal.id
 
 
 def user_info(req, res, resource, param):
-    if req.context['auth_user']:
-        session = req.context['session']
-        user = User.find_by_numeric_id(session, req.context['auth_user'])
-        req.context['user'] = user.auth_permission()
-    else:
-        raise UnauthorizedError()
\ No newline at end of file
+    principal = _principal(req)
+    req.context['user'] = {
+        "id": str(principal.id),
+        "permissions": sorted(principal.permissions)
+    }
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+from types import MappingProxyType
+
+from sqlalchemy.orm import aliased
+
+from app import log
+from app.model import Module, ModulePermission
+from app.model.module import role_has_permission_table
+from app.utils.cache import LRUCache
+
+LOG = log.get_logger()
+
+# Время жизни дерева в кэше: изменения в других процессах видны не позже чем через это время
+PERMISSION_CACHE_TTL = 300
+
+MATCHER_CACHE_SIZE = 256
+
+_trees = LRUCache(maxsize=1, ttl=PERMISSION_CACHE_TTL)
+_matchers = LRUCache(maxsize=MATCHER_CACHE_SIZE, ttl=PERMISSION_CACHE_TTL)
+
+# Шаблоны url: '*' - ровно один сегмент пути, '**' - остаток пути (ноль и более сегментов)
+STAR = '*'
+GLOBSTAR = '**'
+# Ключ конца шаблона в узле дерева (пустой сегмент в пути не встречается)
+END = ''
+# Метод правила, разрешающего любой HTTP-метод
+ANY_METHOD = '*'
+
+
+# Неизменяемая копия: словари - MappingProxyType, списки - кортежи
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# Дерево для настроек ролей: корневой модуль -> дочерний модуль -> права, одним запросом
+def _load(session):
+    parent = aliased(Module)
+    rows = session.query(parent.id, parent.name, Module.id, Module.name,
+                         ModulePermission.id, ModulePermission.name, ModulePermission.method). \
+        join(Module, Module.parent_id == parent.id). \
+        outerjoin(ModulePermission, ModulePermission.module_id == Module.id). \
+        filter(parent.parent_id.is_(None)). \
+        order_by(parent.id, Module.id, ModulePermission.id).all()
+
+    parents = {}
+    modules = {}
+    for parent_id, parent_name, module_id, module_name, permission_id, permission_name, method in rows:
+        node = parents.get(parent_id)
+        if node is None:
+            node = parents[parent_id] = {'id': parent_id, 'label': parent_name, 'children': []}
+        module = modules.get(module_id)
+        if module is None:
+            module = modules[module_id] = {'label': module_name, 'id': module_id, 'children': []}
+            node['children'].append(module)
+        if permission_id is not None:
+            module['children'].append({'name': permission_name, 'id': permission_id, 'method': method})
+    return freeze(list(parents.values()))
+
+
+def split_path(url):
+    return [segment for segment in url.split('/') if segment]
+
+
+class RouteMatcher(object):
+    """
+    Префиксное дерево шаблонов url правил роли, отдельное для каждого HTTP-метода.
+    Узел - словарь сегмент -> узел; проверка пути идет по сегментам, возврат
+    выполняется только при совпадении и точного сегмента, и '*' в одном узле.
+    """
+
+    def __init__(self, rules=()):
+        self.roots = {}
+        for method, url in rules:
+            self.add(method, url)
+
+    def add(self, method, url):
+        node = self.roots.setdefault((method or ANY_METHOD).upper(), {})
+        segments = split_path(url)
+        for i, segment in enumerate(segments):
+            if segment == GLOBSTAR:
+                if i != len(segments) - 1:
+                    LOG.warning("Permission url '%s': segments after '**' are ignored", url)
+                node[GLOBSTAR] = True
+                return
+            node = node.setdefault(segment, {})
+        node[END] = True
+
+    def match(self, method, path):
+        segments = split_path(path)
+        return self._match(self.roots.get(method.upper()), segments, 0) or \
+            self._match(self.roots.get(ANY_METHOD), segments, 0)
+
+    def _match(self, node, segments, i):
+        while node is not None:
+            if GLOBSTAR in node:
+                return True
+            if i == len(segments):
+                return END in node
+            exact = node.get(segments[i])
+            star = node.get(STAR)
+            if exact is not None and star is not None and exact is not star:
+                if self._match(star, segments, i + 1):
+                    return True
+            node = exact if exact is not None else star
+            i += 1
+        return False
+
+
+def _load_matcher(session, role_id):
+    rules = session.query(ModulePermission.method, ModulePermission.url). \
+        join(role_has_permission_table, role_has_permission_table.c.module_permission_id == ModulePermission.id). \
+        filter(role_has_permission_table.c.role_id == role_id).all()
+    return RouteMatcher(rules)
+
+
+# Скомпилированные правила доступа роли
+def get_matcher(session, role_id):
+    return _matchers.get_or_load(role_id, lambda: _load_matcher(session, role_id))
+
+
+def get_tree(session):
+    return _trees.get_or_load('tree', lambda: _load(session))
+
+
+# Сброс кэшей при изменении модулей и прав
+def invalidate():
+    _trees.clear()
+    _matchers.clear()
+
+
+def invalidate_role(role_id):
+    _matchers.pop(role_id)
+
+
+def stats():
+    return {
+        'tree': _trees.stats(),
+        'matchers': _matchers.stats(),
+    }
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+from app.model import User, ModulePermission
+from app.model.module import role_has_permission_table
+from app.utils.cache import LRUCache
+
+PRINCIPAL_CACHE_SIZE = 4096
+# Время жизни записи: изменения, сделанные в других процессах, видны не позже чем через это время
+PRINCIPAL_CACHE_TTL = 300
+
+# Сведения об аутентифицированном пользователе, необходимые для проверки доступа
+Principal = namedtuple('Principal', ['id', 'numeric_id', 'blocked', 'role_id', 'permissions'])
+
+_principals = LRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def _load(session, numeric_id):
+    user = session.query(User.id, User.blocked, User.role_id).filter(User.numeric_id == numeric_id).first()
+    if user is None:
+        return None
+    permissions = session.query(ModulePermission.value). \
+        join(role_has_permission_table, role_has_permission_table.c.module_permission_id == ModulePermission.id). \
+        filter(role_has_permission_table.c.role_id == user.role_id, ModulePermission.value.isnot(None))
+    return Principal(user.id, numeric_id, bool(user.blocked), user.role_id,
+                     frozenset(permission[0] for permission in permissions))
+
+
+# Пользователь по numeric_id из токена; None, если пользователь не найден
+def get_principal(session, numeric_id):
+    principal = _principals.get(numeric_id)
+    if principal is None:
+        principal = _load(session, numeric_id)
+        if principal is not None:
+            _principals.set(numeric_id, principal)
+    return principal
+
+
+def invalidate_user(user_id):
+    _principals.invalidate(lambda numeric_id, principal: principal.id == int(user_id))
+
+
+def invalidate_role(role_id):
+    _principals.invalidate(lambda numeric_id, principal: principal.role_id == int(role_id))
+
+
+def invalidate():
+    _principals.clear()
+
+
+def stats():
+    return _principals.stats()
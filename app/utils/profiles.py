@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from app.model import Module, ModulePermission
+from app.model.module import role_has_permission_table, menu_has_module_table
+from app.model.user import User
+from app.utils import encoder
+from app.utils.cache import LRUCache
+
+PROFILE_CACHE_SIZE = 256
+# Время жизни профиля: изменения в других процессах видны не позже чем через это время
+PROFILE_CACHE_TTL = 300
+
+# Профиль сессии по паре (role_id, menu_id): закодированный фрагмент JSON с меню и ресурсами,
+# общий для всех пользователей с этой ролью и меню
+_profiles = LRUCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+def _load(session, role_id, menu_id):
+    modules = session.query(Module). \
+        join(menu_has_module_table, menu_has_module_table.c.module_id == Module.id). \
+        filter(menu_has_module_table.c.menu_id == menu_id).order_by(Module.id).all() if menu_id else []
+    permissions = session.query(ModulePermission). \
+        join(role_has_permission_table, role_has_permission_table.c.module_permission_id == ModulePermission.id). \
+        filter(role_has_permission_table.c.role_id == role_id).order_by(ModulePermission.id).all() if role_id else []
+    fragment = encoder.dumps({
+        "menus": User.view_menu(modules),
+        "resources": User.view_resources(permissions),
+    })
+    # Без внешних скобок: фрагмент вставляется в объект пользователя
+    return fragment[1:-1]
+
+
+def get_fragment(session, role_id, menu_id):
+    return _profiles.get_or_load((role_id, menu_id), lambda: _load(session, role_id, menu_id))
+
+
+# Данные авторизации пользователя (как User.auth_info) в виде JSON:
+# поля пользователя кодируются на каждый вход, меню и ресурсы берутся из профиля
+def auth_info(session, user):
+    fields = encoder.dumps({
+        "id": str(user.id),
+        "name": str(user.last_name) + " " + str(user.first_name) + " ",
+        "email": user.email,
+        "position": user.position.name if user.position else None,
+    })
+    return fields[:-1] + b',' + get_fragment(session, user.role_id, user.menu_id) + b'}'
+
+
+def invalidate_role(role_id):
+    _profiles.invalidate(lambda key, value: key[0] == role_id)
+
+
+def invalidate_menu(menu_id):
+    _profiles.invalidate(lambda key, value: key[1] == menu_id)
+
+
+# Сброс всех профилей при изменении модулей и прав
+def invalidate():
+    _profiles.clear()
+
+
+def stats():
+    return _profiles.stats()
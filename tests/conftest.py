@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+# Тесты с базой данных выполняются на отдельной базе со схемой после `alembic upgrade head`
+# (нужны индексы миграций), адрес базы - переменная окружения TEST_DATABASE_URL; без нее такие
+# тесты пропускаются. Адрес подставляется в конфигурацию до создания engine приложения
+os.environ.setdefault('APP_ENV', 'test')
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+if TEST_DATABASE_URL:
+    from app import config
+    config.DATABASE_URL = TEST_DATABASE_URL
+
+
+# Все модели импортируются до первого запроса: связи задаются именами классов
+@pytest.fixture(scope='session')
+def engine():
+    from app.database import engine
+    from app.model import doctor, holiday, patient, schedule, visit  # noqa: F401
+    return engine
+
+
+@pytest.fixture
+def session(engine):
+    from sqlalchemy.orm import Session
+    session = Session(bind=engine)
+    yield session
+    session.rollback()
+    session.close()
+
+
+# Пользователь с действительным токеном; удаляется после теста
+@pytest.fixture
+def user(session):
+    from app.model import User
+    from app.utils.auth import uuid, encrypt_token
+
+    numeric_id = uuid()
+    user = User(username='test_%s' % numeric_id, password='-', email='%s@test.local' % numeric_id,
+                numeric_id=numeric_id, token=encrypt_token(numeric_id).decode('utf-8'),
+                last_name='Врачев', first_name='Тест', middle_name='Тестович', blocked=False)
+    session.add(user)
+    session.commit()
+    yield user
+
+    session.rollback()
+    session.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+    session.commit()
+
+
+# Врач пользователя user; после теста удаляются его правила, задания, интервалы, визиты,
+# пациенты визитов и сводка
+@pytest.fixture
+def doctor(session, user):
+    from app.model.doctor import Doctor
+    from app.model.patient import Patient
+    from app.model.visit import Visit
+    from app.model.schedule import Schedule, ScheduleDay, ScheduleRule, ScheduleJob
+
+    doctor = Doctor(user_id=user.id, creator_id=user.id, color='#000000')
+    session.add(doctor)
+    session.commit()
+    yield doctor
+
+    session.rollback()
+    patient_ids = [row[0] for row in session.query(Visit.patient_id).filter(Visit.doctor_id == doctor.id)]
+    session.query(Visit).filter(Visit.doctor_id == doctor.id).delete(synchronize_session=False)
+    if patient_ids:
+        session.query(Patient).filter(Patient.id.in_(patient_ids)).delete(synchronize_session=False)
+    for model in (ScheduleDay, Schedule, ScheduleRule, ScheduleJob):
+        session.query(model).filter(model.doctor_id == doctor.id).delete(synchronize_session=False)
+    session.query(Doctor).filter(Doctor.id == doctor.id).delete(synchronize_session=False)
+    session.commit()
+
+
+# Клиент приложения и заголовок авторизации пользователя user
+@pytest.fixture(scope='session')
+def client(engine):
+    from falcon import testing
+    from app.main import application
+    return testing.TestClient(application)
+
+
+@pytest.fixture
+def headers(user):
+    return {'Authorization': user.token}
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('falcon')
+
+from sqlalchemy import Column, Integer, String, ForeignKey, create_engine, event
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship, backref, sessionmaker
+
+from app.api.common import BaseResource
+from app.utils.alchemy import to_primitive
+
+Base = declarative_base()
+
+
+class Node(Base):
+    __tablename__ = 'node'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(20))
+    parent_id = Column(Integer, ForeignKey('node.id'))
+    children = relationship('Node', backref=backref('parent', remote_side=[id]))
+
+
+def tree():
+    root = Node(id=1, name='root')
+    child = Node(id=2, name='child', parent=root)
+    Node(id=3, name='grandchild', parent=child)
+    return root
+
+
+# Связи раскрываются не глубже depth
+def test_depth_cap():
+    root = tree()
+    assert to_primitive(root, depth=0) == {'id': 1, 'name': 'root'}
+
+    data = to_primitive(root, depth=1)
+    child, = data['children']
+    assert child['name'] == 'child'
+    assert 'children' not in child and 'parent' not in child
+
+    data = to_primitive(root, depth=2)
+    assert data['children'][0]['children'][0]['name'] == 'grandchild'
+
+
+# Объект, уже находящийся на текущем пути обхода, заменяется на None
+def test_cycle_is_cut():
+    root = tree()
+    data = to_primitive(root, depth=10)
+    child = data['children'][0]
+    assert child['parent'] is None
+    assert child['children'][0]['parent'] is None
+
+
+# Белый список полей по классу модели
+def test_fields_whitelist():
+    data = to_primitive(tree(), depth=1, fields={Node: ('name', 'children')})
+    assert data == {'name': 'root', 'children': [{'name': 'child'}]}
+
+
+# Незагруженные связи и столбцы пропускаются без ленивых запросов
+def test_unloaded_attributes_issue_no_queries():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(tree())
+    session.commit()
+    session.close()
+
+    root = session.query(Node).filter(Node.id == 1).one()
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    data = to_primitive(root, depth=3)
+
+    assert statements == []
+    assert data == {'id': 1, 'name': 'root', 'parent_id': None}
+
+
+def test_from_db_to_json():
+    data = json.loads(BaseResource().from_db_to_json([tree()], depth=1).decode('utf-8'))
+    assert data[0]['children'][0]['name'] == 'child'
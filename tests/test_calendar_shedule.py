@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+import app.model.doctor  # noqa: F401 регистрация моделей
+from app.utils import calendar_shedule
+from app.utils.calendar_shedule import generate_rule, free_slots, to_datetime
+
+MONDAY = datetime.date(2030, 1, 14)
+
+
+def rule(rule_id, start_time, end_time, interval=15, start_date='14.01.2030', end_date='14.01.2030',
+         workdays=('MO', 'TU', 'WE', 'TH', 'FR'), exceptions=None):
+    rule = generate_rule(start_date=start_date, end_date=end_date, workdays_list=list(workdays),
+                         start_time=start_time, end_time=end_time, interval=interval, exceptions=exceptions)
+    rule.id = rule_id
+    return rule
+
+
+def times(slots):
+    return [to_datetime(date_start).strftime('%H:%M') for _, date_start, _ in slots]
+
+
+# Пересекающиеся правила: интервал с одним временем начала выдается один раз, от правила с меньшим id
+def test_free_slots_dedup_overlapping_rules():
+    morning = rule(2, '09:00', '10:00')
+    overlap = rule(1, '09:30', '10:30')
+    slots = free_slots([morning, overlap], MONDAY, MONDAY)
+    assert times(slots) == ['09:00', '09:15', '09:30', '09:45', '10:00', '10:15']
+    assert [slot[0] for slot in slots] == [2, 2, 1, 1, 1, 1]
+    assert free_slots([overlap, morning], MONDAY, MONDAY) == slots
+
+
+# Одинаковые правила дают столько же интервалов, сколько одно, и совпадают со сводкой по дням
+def test_free_slots_duplicate_rule_matches_day_counts():
+    first = rule(1, '09:00', '12:00')
+    copy = rule(2, '09:00', '12:00')
+    slots = free_slots([first, copy], MONDAY, MONDAY)
+    assert slots == free_slots([first], MONDAY, MONDAY)
+    assert calendar_shedule.day_counts(slot[1] for slot in slots) == {MONDAY: 12}
+
+
+# Занятое время не выдается ни одним из пересекающихся правил
+def test_free_slots_busy_excluded_from_every_rule():
+    busy = [calendar_shedule.to_seconds(datetime.datetime(2030, 1, 14, 9, 30))]
+    slots = free_slots([rule(1, '09:00', '10:00'), rule(2, '09:30', '10:00', interval=10)], MONDAY, MONDAY,
+                       busy=busy)
+    assert times(slots) == ['09:00', '09:15', '09:40', '09:45', '09:50']
+
+
+def ordinal(day):
+    return day.toordinal()
+
+
+def days_of(starts):
+    return sorted({to_datetime(start).date() for start in starts})
+
+
+# Маска рабочих дней: неделя с понедельника, выходные и праздники - нули
+def test_day_mask_weekdays():
+    assert MONDAY.weekday() == 0
+    weekdays = calendar_shedule.workdays_mask(['MO', 'TU', 'WE', 'TH', 'FR'])
+    assert list(calendar_shedule.day_mask(ordinal(MONDAY), 7, weekdays)) == [1, 1, 1, 1, 1, 0, 0]
+    weekend = calendar_shedule.workdays_mask(['SA', 'SU'])
+    assert list(calendar_shedule.day_mask(ordinal(MONDAY), 7, weekend)) == [0, 0, 0, 0, 0, 1, 1]
+    # Период с субботы: маска сдвигается вместе с днями недели
+    saturday = MONDAY + datetime.timedelta(days=5)
+    assert list(calendar_shedule.day_mask(ordinal(saturday), 3, weekdays)) == [0, 0, 1]
+    assert list(calendar_shedule.day_mask(ordinal(MONDAY), 0, weekdays)) == []
+
+
+def test_day_mask_holidays():
+    weekdays = calendar_shedule.workdays_mask([])
+    holidays = {ordinal(MONDAY + datetime.timedelta(days=2)), ordinal(MONDAY + datetime.timedelta(days=6))}
+    assert list(calendar_shedule.day_mask(ordinal(MONDAY), 7, weekdays, holidays)) == [1, 1, 0, 1, 1, 0, 0]
+
+
+def test_workdays_default_and_unknown():
+    assert calendar_shedule.workdays_mask([]) == 0b0011111
+    assert calendar_shedule.workdays_mask(['SU']) == 1 << 6
+    with pytest.raises(ValueError):
+        calendar_shedule.workdays_mask(['XX'])
+
+
+# Проверка параметров задания без построения сетки
+def test_validate_params():
+    calendar_shedule.validate_params(start_date='14.01.2030', end_date='20.01.2030', workdays_list=['MO'],
+                                     start_time='09:00', end_time='10:00', interval=15)
+    for params in ({'workdays_list': ['XX']}, {'interval': 0}, {'start_time': '9'}, {'start_date': '2030-01-14'}):
+        with pytest.raises(ValueError):
+            calendar_shedule.validate_params(**dict({'start_date': '14.01.2030', 'workdays_list': ['MO'],
+                                                     'start_time': '09:00', 'end_time': '10:00', 'interval': 15},
+                                                    **params))
+
+
+# Смещения начала интервалов от полуночи: окончание приема не входит
+def test_slot_offsets():
+    offsets = calendar_shedule.slot_offsets(datetime.time(9, 0), datetime.time(10, 0), 15)
+    assert list(offsets) == [9 * 3600, 9 * 3600 + 900, 9 * 3600 + 1800, 9 * 3600 + 2700]
+    assert list(calendar_shedule.slot_offsets(datetime.time(9, 0), datetime.time(9, 0), 15)) == []
+    assert list(calendar_shedule.slot_offsets(datetime.time(9, 30), datetime.time(10, 0), 20)) == \
+        [9 * 3600 + 1800, 9 * 3600 + 3000]
+
+
+# Сетка интервалов: смещения повторяются в каждом рабочем дне, окончание - начало плюс интервал
+def test_plan_vector():
+    offsets = calendar_shedule.slot_offsets(datetime.time(9, 0), datetime.time(10, 0), 30)
+    holidays = {ordinal(MONDAY + datetime.timedelta(days=1))}
+    starts, ends = calendar_shedule.plan(ordinal(MONDAY), 7, calendar_shedule.workdays_mask([]), holidays, offsets, 30)
+    assert len(starts) == len(ends) == 4 * len(offsets)
+    assert days_of(starts) == [MONDAY + datetime.timedelta(days=i) for i in (0, 2, 3, 4)]
+    assert [to_datetime(start) for start in starts[:2]] == [datetime.datetime(2030, 1, 14, 9, 0),
+                                                           datetime.datetime(2030, 1, 14, 9, 30)]
+    assert all(end - start == 30 * 60 for start, end in zip(starts, ends))
+    assert list(starts) == sorted(starts)
+
+
+def test_generate_plan_matches_plan():
+    starts, ends = calendar_shedule.generate_plan(start_date='14.01.2030', end_date='20.01.2030',
+                                                  holidays_list=[datetime.date(2030, 1, 15)],
+                                                  start_time='09:00', end_time='10:00', interval=30)
+    assert days_of(starts) == [MONDAY + datetime.timedelta(days=i) for i in (0, 2, 3, 4)]
+    assert len(starts) == 8
+
+
+# Интервалы правила: пересечение периода запроса с периодом правила, без праздников и исключений
+def test_rule_plan_clips_period():
+    weekly = rule(1, '09:00', '10:00', interval=30, start_date='15.01.2030', end_date='17.01.2030',
+                  exceptions=['16.01.2030'])
+    starts, ends = calendar_shedule.rule_plan(weekly, MONDAY, MONDAY + datetime.timedelta(days=6))
+    assert days_of(starts) == [datetime.date(2030, 1, 15), datetime.date(2030, 1, 17)]
+    assert len(ends) == 4
+
+    starts, _ = calendar_shedule.rule_plan(weekly, MONDAY, MONDAY + datetime.timedelta(days=6),
+                                           holidays={ordinal(datetime.date(2030, 1, 17))})
+    assert days_of(starts) == [datetime.date(2030, 1, 15)]
+
+    starts, ends = calendar_shedule.rule_plan(weekly, datetime.date(2030, 1, 18), datetime.date(2030, 1, 31))
+    assert len(starts) == len(ends) == 0
+
+
+# Граница правила: начало интервала внутри правила дает окончание, иначе None
+def test_rule_contains_bounds():
+    weekly = rule(1, '09:00', '10:00', interval=30, start_date='15.01.2030', end_date='17.01.2030',
+                  exceptions=['16.01.2030'])
+    tuesday = datetime.datetime(2030, 1, 15)
+    assert calendar_shedule.rule_contains(weekly, tuesday.replace(hour=9)) == tuesday.replace(hour=9, minute=30)
+    assert calendar_shedule.rule_contains(weekly, tuesday.replace(hour=9, minute=30)) == tuesday.replace(hour=10)
+    # Начало между интервалами, до и на окончании приема
+    assert calendar_shedule.rule_contains(weekly, tuesday.replace(hour=9, minute=15)) is None
+    assert calendar_shedule.rule_contains(weekly, tuesday.replace(hour=8, minute=30)) is None
+    assert calendar_shedule.rule_contains(weekly, tuesday.replace(hour=10)) is None
+    # Дни вне периода правила, день-исключение и праздник
+    assert calendar_shedule.rule_contains(weekly, datetime.datetime(2030, 1, 14, 9)) is None
+    assert calendar_shedule.rule_contains(weekly, datetime.datetime(2030, 1, 18, 9)) is None
+    assert calendar_shedule.rule_contains(weekly, datetime.datetime(2030, 1, 16, 9)) is None
+    assert calendar_shedule.rule_contains(weekly, datetime.datetime(2030, 1, 17, 9)) is not None
+    assert calendar_shedule.rule_contains(weekly, datetime.datetime(2030, 1, 17, 9),
+                                          holidays={ordinal(datetime.date(2030, 1, 17))}) is None
+    # Выходной в периоде правила
+    weekend = rule(2, '09:00', '10:00', start_date='14.01.2030', end_date='20.01.2030')
+    assert calendar_shedule.rule_contains(weekend, datetime.datetime(2030, 1, 19, 9)) is None
+    assert calendar_shedule.rule_contains(weekend, datetime.datetime(2030, 1, 20, 9)) is None
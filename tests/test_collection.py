@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import os
+import datetime
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from app.api.common.base import PAGE_LIMIT
+from app.model.holiday import Holiday
+from app.utils import holidays
+
+NAME = 'Тест страниц'
+COUNT = 7
+FIRST = datetime.datetime(2040, 1, 1)
+
+
+# Праздники теста отбираются фильтром ?name=, остальные строки таблицы на страницы не влияют
+@pytest.fixture
+def holiday_ids(session):
+    rows = [Holiday(date=FIRST + datetime.timedelta(days=i), name=NAME) for i in range(COUNT)]
+    session.add_all(rows)
+    session.commit()
+    yield sorted(row.id for row in rows)
+    session.rollback()
+    session.query(Holiday).filter(Holiday.name == NAME).delete(synchronize_session=False)
+    session.commit()
+    holidays.invalidate()
+
+
+def get(client, headers, query_string):
+    return client.simulate_get('/v1/holidays', headers=headers, query_string=query_string)
+
+
+def page(client, headers, query_string):
+    result = get(client, headers, query_string)
+    assert result.status_code == 200, result.text
+    return result.json['data']['items'], result.json['meta']['paging']
+
+
+# Переход по paging.next выдает все строки по возрастанию id без пропусков и повторов
+def test_next_cursor_continuity(client, headers, holiday_ids):
+    seen = []
+    after = None
+    pages = 0
+    while True:
+        query_string = 'name=%s&limit=3' % NAME + ('&after=%d' % after if after is not None else '')
+        items, paging = page(client, headers, query_string)
+        assert paging['limit'] == 3
+        seen.extend(item['id'] for item in items)
+        pages += 1
+        after = paging['next']
+        if after is None:
+            break
+        assert after == items[-1]['id']
+    assert seen == holiday_ids
+    assert pages == 3
+
+
+# Последняя полная страница: next равен None, следующей пустой страницы нет
+def test_next_is_none_on_exact_last_page(client, headers, holiday_ids):
+    items, paging = page(client, headers, 'name=%s&limit=%d' % (NAME, COUNT))
+    assert [item['id'] for item in items] == holiday_ids
+    assert paging['next'] is None
+
+    items, paging = page(client, headers, 'name=%s&limit=%d' % (NAME, COUNT - 1))
+    assert paging['next'] == holiday_ids[-2]
+    assert get(client, headers, 'name=%s&after=%d' % (NAME, holiday_ids[-1])).status_code == 204
+
+
+# Без ?limit= страница ограничена PAGE_LIMIT строк, ?count=true дает общее количество
+def test_default_limit_and_count(client, headers, holiday_ids):
+    items, paging = page(client, headers, 'name=%s&count=true' % NAME)
+    assert paging['limit'] == PAGE_LIMIT
+    assert paging['total'] == COUNT
+    assert paging['next'] is None
+
+
+def test_filter_operators(client, headers, holiday_ids):
+    items, _ = page(client, headers, 'name=%s&id__gte=%d' % (NAME, holiday_ids[2]))
+    assert [item['id'] for item in items] == holiday_ids[2:]
+    items, _ = page(client, headers, 'name=%s&id__in=%d,%d' % (NAME, holiday_ids[0], holiday_ids[-1]))
+    assert [item['id'] for item in items] == [holiday_ids[0], holiday_ids[-1]]
+    items, _ = page(client, headers, 'name=%s&id__ne=%d&fields=name' % (NAME, holiday_ids[0]))
+    assert items == [{'id': holiday_id, 'name': NAME} for holiday_id in holiday_ids[1:]]
+
+
+# Неизвестный оператор, значение не того типа и неизвестное поле - ошибка запроса
+@pytest.mark.parametrize('query_string', ['id__like=1', 'name__contains=x', 'id__gte=abc', 'after=abc',
+                                          'limit=0', 'fields=password'])
+def test_bad_parameters(client, headers, holiday_ids, query_string):
+    result = get(client, headers, 'name=%s&%s' % (NAME, query_string))
+    assert result.status_code == 400, result.text
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import time
+import datetime
+import decimal
+from types import MappingProxyType
+
+import pytest
+
+from app.utils import encoder
+
+ITEMS = 5000
+ROUNDS = 5
+
+
+def backends():
+    available = [('json', encoder._json_dumps)]
+    if encoder.ujson is not None and encoder._ujson_supported():
+        available.append(('ujson', encoder._ujson_dumps))
+    if encoder.orjson is not None:
+        available.append(('orjson', encoder._orjson_dumps))
+    return available
+
+
+# Событие календаря и пациент - самые объемные ответы API (списки визитов и пациентов)
+def calendar_item(i):
+    return {
+        'id': i,
+        'title': '   ОМС     Пациент:  Иванов Иван Иванович   Тел: +7 (900) 000-00-%02d Врач: Петров П. П.' % (i % 100),
+        'start': '2019-04-18 10:00',
+        'end': '2019-04-18 10:20',
+        'backgroundColor': '#ffa500',
+        'borderColor': '#ffa500',
+    }
+
+
+def patient(i):
+    return {
+        'id': i,
+        'last_name': 'Иванов',
+        'first_name': 'Иван',
+        'middle_name': '',
+        'mobile': '+79000000%03d' % (i % 1000),
+        'created': datetime.datetime(2019, 4, 18, 10, i % 60),
+        'modified': datetime.date(2019, 4, 18),
+    }
+
+
+def payloads():
+    return {
+        'calendar': {'meta': {'code': 200, 'message': 'OK'}, 'data': {'items': [calendar_item(i) for i in range(ITEMS)]}},
+        'patients': {'meta': {'code': 200, 'message': 'OK', 'paging': {'next': ITEMS}},
+                     'data': {'items': [patient(i) for i in range(ITEMS)]}},
+    }
+
+
+SAMPLE = {
+    'ascii': 'OK',
+    'text': 'Пациент «Ёлкин» — запись №1',
+    'int': 42,
+    'negative': -7,
+    'bool': True,
+    'none': None,
+    'float': 0.5,
+    'decimal': decimal.Decimal('1500.25'),
+    'datetime': datetime.datetime(2019, 4, 18, 10, 20, 30),
+    'date': datetime.date(2019, 4, 18),
+    'time': datetime.time(10, 20),
+    'set': {1},
+    'frozen': MappingProxyType({'ключ': 'значение'}),
+    'nested': [{'a': [1, 2, {'b': None}]}, []],
+    'empty': {},
+}
+
+
+@pytest.mark.parametrize('name, dumps', backends())
+def test_backend_output_matches_json(name, dumps):
+    assert dumps(SAMPLE) == encoder._json_dumps(SAMPLE)
+    for payload in payloads().values():
+        assert dumps(payload) == encoder._json_dumps(payload)
+
+
+def test_dates_are_timestamps():
+    expected = int(time.mktime(datetime.datetime(2019, 4, 18, 10, 20, 30).timetuple()))
+    assert encoder.dumps({'d': SAMPLE['datetime']}) == ('{"d":%d}' % expected).encode('utf-8')
+
+
+def test_non_ascii_is_not_escaped():
+    assert encoder.dumps('Ёлкин') == '"Ёлкин"'.encode('utf-8')
+
+
+def test_unknown_type_raises():
+    with pytest.raises(TypeError):
+        encoder.dumps({'object': object()})
+
+
+# Кодирование самых объемных ответов каждым доступным кодировщиком
+def test_encoder_benchmark():
+    print('\nencoder backend: %s' % encoder.BACKEND)
+    for payload_name, payload in payloads().items():
+        for name, dumps in backends():
+            started = time.monotonic()
+            for _ in range(ROUNDS):
+                size = len(dumps(payload))
+            elapsed = (time.monotonic() - started) / ROUNDS
+            print('%-9s %-7s %8d bytes %8.2f ms' % (payload_name, name, size, elapsed * 1000))
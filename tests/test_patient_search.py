@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import random
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import text
+
+from app.model.patient import Patient
+
+# Объем таблицы для замера: PATIENT_BENCH_ROWS=1000000 для полного прогона
+ROWS = int(os.environ.get('PATIENT_BENCH_ROWS', 100000))
+QUERIES = 200
+LIMIT = 20
+# Порог p95 поиска по индексам ix_patient_name_trgm и ix_patient_mobile_digits_trgm
+P95_MS = float(os.environ.get('PATIENT_SEARCH_P95_MS', 50))
+
+# Номера пациентов теста и замера не пересекаются с остальными данными базы
+MOBILE_PREFIX = '+7 (977) '
+BENCH_PREFIX = '+7 (988) '
+
+PATIENTS = (
+    ('Иванов', 'Иван', 'Иванович', MOBILE_PREFIX + '123-45-67'),
+    ('Иванова', 'Мария', 'Петровна', MOBILE_PREFIX + '123-45-670'),
+    ('Сидоров', 'Иван', 'Иванович', MOBILE_PREFIX + '765-43-21'),
+    ('Петров-Иванов', 'Олег', 'Олегович', MOBILE_PREFIX + '555-00-00'),
+    ('Ивановский', 'Илья', 'Ильич', MOBILE_PREFIX + '555-00-01'),
+)
+
+FILL_SQL = text("""
+    INSERT INTO patient (created, modified, last_name, first_name, middle_name, mobile)
+    SELECT now(), now(), 'Замеров' || n, 'Пациент', 'Тестович', :prefix || lpad(n::text, 7, '0')
+    FROM generate_series(0, :rows - 1) AS n
+""")
+
+
+def has_trgm(session):
+    return session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar() is not None
+
+
+@pytest.fixture
+def trgm(session):
+    if not has_trgm(session):
+        pytest.skip('расширение pg_trgm не установлено')
+
+
+@pytest.fixture
+def patients(session):
+    ids = [Patient.upsert(session, *patient) for patient in PATIENTS]
+    session.commit()
+    yield dict(zip((patient[0] for patient in PATIENTS), ids))
+    session.rollback()
+    session.query(Patient).filter(Patient.id.in_(ids)).delete(synchronize_session=False)
+    session.commit()
+
+
+# Результаты поиска по пациентам теста в порядке выдачи
+def found(session, patients, q):
+    ids = set(patients.values())
+    names = dict((patient_id, name) for name, patient_id in patients.items())
+    return [names[patient.id] for patient in Patient.search(session, q, 100) if patient.id in ids]
+
+
+@pytest.mark.parametrize('q', ['', '  ', 'ив', '12', '+7 (9'])
+def test_short_query_is_rejected(session, q):
+    with pytest.raises(ValueError):
+        Patient.search(session, q, LIMIT)
+
+
+# Строка из цифр и знаков телефона ищется по цифрам номера, более короткие номера первыми
+def test_phone_query_searches_mobile_digits(session, patients):
+    assert found(session, patients, '123-45-67') == ['Иванов', 'Иванова']
+    assert found(session, patients, '(977) 1234567') == ['Иванов', 'Иванова']
+    assert found(session, patients, '4567') == ['Иванов', 'Иванова']
+    assert found(session, patients, '765 43') == ['Сидоров']
+    assert found(session, patients, '555-00') == ['Петров-Иванов', 'Ивановский']
+
+
+def test_phone_query_respects_limit(session, patients):
+    result = Patient.search(session, MOBILE_PREFIX, 1)
+    assert len(result) == 1
+
+
+# Строка с буквами ищется по ФИО: каждое слово должно входить в ФИО, без учета регистра
+def test_name_query_matches_every_word(session, patients, trgm):
+    assert set(found(session, patients, 'ИВАН')) == set(patients)
+    assert found(session, patients, 'иван сидор') == ['Сидоров']
+    assert found(session, patients, 'олегович') == ['Петров-Иванов']
+
+
+# Цифры в строке с буквами не переключают поиск на номер телефона
+def test_mixed_query_uses_name_route(session, patients, trgm):
+    assert found(session, patients, 'иванов 1234567') == []
+    assert found(session, patients, 'иванов 555') == []
+
+
+# Спецсимволы LIKE в строке поиска экранируются
+def test_like_wildcards_are_escaped(session, patients, trgm):
+    assert found(session, patients, 'ив%ов') == []
+    assert found(session, patients, 'ив_нов') == []
+
+
+# Точное совпадение слова выше совпадения с частью слова
+def test_name_ranking(session, patients, trgm):
+    ranked = found(session, patients, 'иванов')
+    assert ranked[0] == 'Иванов'
+    assert set(ranked) == {'Иванов', 'Иванова', 'Сидоров', 'Петров-Иванов', 'Ивановский'}
+
+    assert found(session, patients, 'иванов иван')[0] == 'Иванов'
+
+
+@pytest.fixture
+def filled(engine, session, trgm):
+    session.execute(FILL_SQL, {'prefix': BENCH_PREFIX, 'rows': ROWS})
+    session.commit()
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level='AUTOCOMMIT').execute('VACUUM ANALYZE patient')
+    yield
+    session.rollback()
+    session.execute(text('DELETE FROM patient WHERE mobile LIKE :prefix'), {'prefix': BENCH_PREFIX + '%'})
+    session.commit()
+
+
+def p95(session, queries):
+    timings = []
+    for q in queries:
+        started = time.monotonic()
+        Patient.search(session, q, LIMIT)
+        timings.append(time.monotonic() - started)
+    timings.sort()
+    return timings[int(len(timings) * 0.95) - 1]
+
+
+# p95 поиска по номеру и по ФИО на таблице из ROWS пациентов
+def test_search_latency(session, filled):
+    numbers = [random.randrange(ROWS) for _ in range(QUERIES)]
+    mobile = p95(session, ['%07d' % n for n in numbers])
+    name = p95(session, ['замеров%d' % n for n in numbers])
+    print('\npatient search: %d rows, mobile p95 %.2f ms, name p95 %.2f ms' % (ROWS, mobile * 1000, name * 1000))
+    assert mobile * 1000 < P95_MS
+    assert name * 1000 < P95_MS
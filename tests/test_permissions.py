@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from app.utils.permissions import RouteMatcher, split_path
+
+RULES = 1000
+LOOKUPS = 20000
+
+
+def matcher(*rules):
+    return RouteMatcher(rules)
+
+
+def test_exact_rule():
+    m = matcher(('GET', '/patients'))
+    assert m.match('GET', '/patients')
+    assert m.match('get', '/patients/')
+    assert not m.match('GET', '/patients/1')
+    assert not m.match('GET', '/patient')
+    assert not m.match('GET', '/')
+    assert not m.match('POST', '/patients')
+
+
+def test_star_matches_exactly_one_segment():
+    m = matcher(('GET', '/patient/*'))
+    assert m.match('GET', '/patient/1')
+    assert not m.match('GET', '/patient')
+    assert not m.match('GET', '/patient/1/visits')
+
+
+def test_globstar_matches_rest_of_path():
+    m = matcher(('GET', '/schedules/**'))
+    assert m.match('GET', '/schedules')
+    assert m.match('GET', '/schedules/jobs')
+    assert m.match('GET', '/schedules/jobs/1')
+    assert not m.match('GET', '/schedule')
+    assert not m.match('GET', '/visits/schedules')
+
+
+def test_globstar_ignores_trailing_segments():
+    m = matcher(('GET', '/a/**/b'))
+    assert m.match('GET', '/a/x/y')
+
+
+# Точный сегмент и '*' в одном узле: при неудаче по точному сегменту проверяется ветка '*'
+def test_backtracking_between_exact_and_star():
+    m = matcher(('GET', '/user/me/settings'), ('GET', '/user/*/visits'))
+    assert m.match('GET', '/user/me/settings')
+    assert m.match('GET', '/user/me/visits')
+    assert m.match('GET', '/user/42/visits')
+    assert not m.match('GET', '/user/42/settings')
+
+
+def test_method_wildcard():
+    m = matcher(('*', '/holidays'), (None, '/positions'), ('DELETE', '/roles'))
+    for method in ('GET', 'POST', 'PUT', 'DELETE'):
+        assert m.match(method, '/holidays')
+        assert m.match(method, '/positions')
+    assert m.match('DELETE', '/roles')
+    assert not m.match('GET', '/roles')
+
+
+def test_empty_matcher_denies():
+    m = matcher()
+    assert not m.match('GET', '/')
+    assert not m.match('GET', '/patients')
+
+
+def test_split_path():
+    assert split_path('//v1//patients/') == ['v1', 'patients']
+    assert split_path('/') == []
+
+
+# 1000 правил роли: время проверки пути
+def test_matcher_with_many_rules():
+    rules = [('GET', '/module%d/*/item%d' % (i % 50, i)) for i in range(RULES)]
+    rules.append(('POST', '/module7/**'))
+    m = RouteMatcher(rules)
+    paths = [('GET', '/module%d/%d/item%d' % (i % 50, i, i)) for i in range(RULES)] + \
+        [('GET', '/module%d/x/missing' % (i % 50)) for i in range(RULES)] + [('POST', '/module7/a/b/c')]
+
+    started = time.monotonic()
+    allowed = 0
+    for i in range(LOOKUPS):
+        method, path = paths[i % len(paths)]
+        allowed += m.match(method, path)
+    elapsed = time.monotonic() - started
+
+    assert m.match('GET', '/module3/5/item3')
+    assert not m.match('GET', '/module3/5/item4')
+    assert m.match('POST', '/module7/a/b/c')
+    assert not m.match('POST', '/module8/a')
+    assert allowed > 0
+    per_lookup = elapsed / LOOKUPS
+    # Порог с запасом: проверка идет по сегментам пути, а не по списку правил
+    assert per_lookup < 0.0005
+    print('\nroute matcher: %d rules, %d lookups, %.1f us/lookup' % (len(rules), LOOKUPS, per_lookup * 1e6))
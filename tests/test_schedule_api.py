@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import datetime
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from app.model.schedule import ScheduleDay
+
+DAY = datetime.date(2030, 4, 1)
+
+
+def post_rule(client, headers, doctor, start_time, end_time, interval=15, **params):
+    body = dict({'doctor': doctor.id, 'period': False, 'date_one': DAY.strftime('%d.%m.%Y'),
+                 'startTime': start_time, 'endTime': end_time, 'interval': interval,
+                 'workdays': ['MO', 'TU', 'WE', 'TH', 'FR']}, **params)
+    result = client.simulate_post('/v1/schedules', headers=headers, body=json.dumps(body))
+    assert result.status_code == 200, result.text
+    return result.json['data']
+
+
+def day_slots(client, headers, doctor):
+    result = client.simulate_get('/v1/schedules', headers=headers,
+                                 query_string='doctor_id=%d&date=%s' % (doctor.id, DAY.strftime('%d.%m.%Y')))
+    assert result.status_code == 200, result.text
+    return result.json['data']['items']
+
+
+def free_on(session, doctor):
+    session.expire_all()
+    return session.query(ScheduleDay.free).filter(ScheduleDay.doctor_id == doctor.id,
+                                                  ScheduleDay.day == DAY).scalar()
+
+
+# Пересекающиеся правила: интервалы дня без повторов, их число совпадает со сводкой schedule_day
+def test_overlapping_rules_list_each_slot_once(client, headers, session, doctor):
+    post_rule(client, headers, doctor, '09:00', '10:00')
+    post_rule(client, headers, doctor, '09:30', '10:30')
+
+    items = day_slots(client, headers, doctor)
+    starts = [item['date_start'] for item in items]
+    assert len(starts) == len(set(starts)) == 6
+    assert free_on(session, doctor) == len(items)
+
+
+# Построчное формирование расписания фоновой задачей (Celery в режиме eager): интервалы записаны частями,
+# задание завершено, сводка по дням пересчитана
+def test_materialize_job(client, headers, session, doctor, monkeypatch):
+    from app import tasks
+    from app.model.schedule import Schedule, ScheduleJob
+
+    monkeypatch.setattr(tasks, 'JOB_CHUNK_SIZE', 5)
+    data = post_rule(client, headers, doctor, '09:00', '12:00', interval=20, period=True, materialize=True,
+                     dates=['01.04.2030', '07.04.2030'])
+    job_id = int(data['job_id'])
+
+    result = client.simulate_get('/v1/schedules/jobs/%d' % job_id, headers=headers)
+    assert result.status_code == 200, result.text
+    job = result.json['data']
+    assert job['status'] == ScheduleJob.DONE, job['error']
+    assert job['total'] == job['count'] == 5 * 9
+    assert job['progress'] == 100.0
+
+    rows = session.query(Schedule.date_start, Schedule.date_end).filter(Schedule.doctor_id == doctor.id). \
+        order_by(Schedule.date_start).all()
+    assert len(rows) == 5 * 9
+    assert rows[0] == (datetime.datetime(2030, 4, 1, 9, 0), datetime.datetime(2030, 4, 1, 9, 20))
+    assert rows[-1] == (datetime.datetime(2030, 4, 5, 11, 40), datetime.datetime(2030, 4, 5, 12, 0))
+    assert free_on(session, doctor) == 9
+    assert len(day_slots(client, headers, doctor)) == 9
+
+
+def test_materialize_rejects_bad_workdays(client, headers, doctor):
+    body = {'doctor': doctor.id, 'period': False, 'date_one': DAY.strftime('%d.%m.%Y'), 'startTime': '09:00',
+            'endTime': '10:00', 'interval': 15, 'workdays': ['XX'], 'materialize': True}
+    result = client.simulate_post('/v1/schedules', headers=headers, body=json.dumps(body))
+    assert result.status_code == 400, result.text
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import os
+import datetime
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from app.model.holiday import Holiday
+from app.model.schedule import Schedule, ScheduleDay
+from app.utils import holidays
+from app.utils.calendar_shedule import generate_rule, free_counts, refresh_days, refresh_day
+
+MONDAY = datetime.date(2030, 5, 6)
+FRIDAY = MONDAY + datetime.timedelta(days=4)
+SUNDAY = MONDAY + datetime.timedelta(days=6)
+
+
+def at(day, hour, minute=0):
+    return datetime.datetime.combine(day, datetime.time(hour, minute))
+
+
+def week_days(first=MONDAY, count=5):
+    return [first + datetime.timedelta(days=i) for i in range(count)]
+
+
+def summary(session, doctor):
+    session.expire_all()
+    return dict(session.query(ScheduleDay.day, ScheduleDay.free).filter(ScheduleDay.doctor_id == doctor.id))
+
+
+# Правило врача на неделю: по 4 интервала в рабочий день
+@pytest.fixture
+def weekly(session, doctor):
+    rule = generate_rule(start_date=MONDAY.strftime('%d.%m.%Y'), end_date=SUNDAY.strftime('%d.%m.%Y'),
+                         workdays_list=['MO', 'TU', 'WE', 'TH', 'FR'], start_time='09:00', end_time='10:00',
+                         interval=15, doctor=doctor.id, creator=doctor.user_id)
+    session.add(rule)
+    session.commit()
+    return rule
+
+
+@pytest.fixture
+def holiday(session):
+    holiday = Holiday(date=at(MONDAY + datetime.timedelta(days=2), 0), name='Тестовый праздник')
+    session.add(holiday)
+    session.commit()
+    holidays.invalidate()
+    yield holiday
+    session.rollback()
+    session.query(Holiday).filter(Holiday.id == holiday.id).delete(synchronize_session=False)
+    session.commit()
+    holidays.invalidate()
+
+
+def test_free_counts_from_rule(session, doctor, weekly):
+    assert free_counts(session, doctor.id, MONDAY, SUNDAY) == {day: 4 for day in week_days()}
+    assert free_counts(session, doctor.id, FRIDAY, FRIDAY) == {FRIDAY: 4}
+
+
+# Занятые интервалы вычитаются, свободная строка schedule со временем интервала правила учитывается один раз
+def test_free_counts_merges_schedule_rows(session, doctor, weekly):
+    tuesday = MONDAY + datetime.timedelta(days=1)
+    session.add_all([
+        Schedule(doctor_id=doctor.id, is_busy=True, date_start=at(MONDAY, 9), date_end=at(MONDAY, 9, 15)),
+        Schedule(doctor_id=doctor.id, is_busy=False, date_start=at(tuesday, 9), date_end=at(tuesday, 9, 15)),
+        Schedule(doctor_id=doctor.id, is_busy=False, date_start=at(tuesday, 18), date_end=at(tuesday, 18, 15)),
+        Schedule(doctor_id=doctor.id, is_busy=False, date_start=at(SUNDAY, 10), date_end=at(SUNDAY, 10, 15)),
+    ])
+    session.commit()
+    counts = free_counts(session, doctor.id, MONDAY, SUNDAY)
+    assert counts[MONDAY] == 3
+    assert counts[tuesday] == 5
+    assert counts[SUNDAY] == 1
+
+
+# Повторный пересчет заменяет строки сводки периода, а не добавляет к ним
+def test_refresh_days_is_idempotent(session, doctor, weekly):
+    stale = SUNDAY
+    session.add(ScheduleDay(doctor_id=doctor.id, day=stale, free=7))
+    session.commit()
+
+    refresh_days(session, doctor.id, MONDAY, SUNDAY)
+    session.commit()
+    expected = {day: 4 for day in week_days()}
+    assert summary(session, doctor) == expected
+
+    refresh_days(session, doctor.id, MONDAY, SUNDAY)
+    refresh_days(session, doctor.id, MONDAY, MONDAY)
+    session.commit()
+    assert summary(session, doctor) == expected
+
+
+# Пересчет части периода не затрагивает остальные дни
+def test_refresh_days_partial_period(session, doctor, weekly):
+    refresh_days(session, doctor.id, MONDAY, SUNDAY)
+    session.add(Schedule(doctor_id=doctor.id, is_busy=True, date_start=at(FRIDAY, 9, 30),
+                         date_end=at(FRIDAY, 9, 45)))
+    refresh_days(session, doctor.id, FRIDAY, FRIDAY)
+    session.commit()
+    expected = {day: 4 for day in week_days()}
+    expected[FRIDAY] = 3
+    assert summary(session, doctor) == expected
+
+
+# Праздник: день исключается из сводки при пересчете дня всех врачей
+def test_refresh_day_after_holiday(session, doctor, weekly, holiday):
+    wednesday = holiday.date.date()
+    session.add(ScheduleDay(doctor_id=doctor.id, day=wednesday, free=4))
+    session.commit()
+    assert doctor.id in ScheduleDay.doctors_on(session, wednesday)
+
+    refresh_day(session, wednesday)
+    session.commit()
+    assert wednesday not in summary(session, doctor)
+    assert free_counts(session, doctor.id, MONDAY, SUNDAY) == {day: 4 for day in week_days() if day != wednesday}
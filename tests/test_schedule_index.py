@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import random
+import datetime
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import event, text
+
+from app.model.schedule import Schedule
+
+# Объем таблицы для замера: SCHEDULE_BENCH_ROWS=5000000 для полного прогона
+ROWS = int(os.environ.get('SCHEDULE_BENCH_ROWS', 200000))
+QUERIES = 200
+FIRST = datetime.datetime(2031, 1, 1)
+STEP_MINUTES = 15
+
+FILL_SQL = text("""
+    INSERT INTO schedule (created, modified, date_start, date_end, doctor_id, is_busy)
+    SELECT now(), now(), ts, ts + interval '15 minutes', :doctor_id, n % 3 = 0
+    FROM generate_series(0, :rows - 1) AS n,
+         LATERAL (SELECT CAST(:first AS timestamp) + n * interval '15 minutes') AS slot(ts)
+""")
+
+
+@pytest.fixture
+def filled(engine, session, doctor):
+    session.execute(FILL_SQL, {'doctor_id': doctor.id, 'rows': ROWS, 'first': FIRST})
+    session.commit()
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level='AUTOCOMMIT').execute('VACUUM ANALYZE schedule')
+    return doctor
+
+
+@pytest.fixture
+def captured(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def plan_of(session, statement, parameters):
+    plan = session.execute(text('EXPLAIN (FORMAT JSON) ' + statement.replace('%(', ':').replace(')s', '')),
+                           parameters).scalar()
+    return json.dumps(plan if not isinstance(plan, str) else json.loads(plan))
+
+
+def random_day():
+    days = ROWS * STEP_MINUTES // (24 * 60)
+    return FIRST + datetime.timedelta(days=random.randrange(max(days, 1)))
+
+
+# Свободные интервалы врача за день читаются по частичному индексу ix_schedule_doctor_free
+def test_free_between_uses_partial_index(session, filled, captured):
+    day = random_day()
+    Schedule.free_between(session, filled.id, day, day + datetime.timedelta(days=1))
+    statement, parameters = captured[-1]
+    plan = plan_of(session, statement, parameters)
+    assert 'ix_schedule_doctor_free' in plan
+    assert 'Index Only Scan' in plan
+
+
+def test_busy_between_uses_partial_index(session, filled, captured):
+    day = random_day()
+    Schedule.busy_between(session, filled.id, day, day + datetime.timedelta(days=1))
+    statement, parameters = captured[-1]
+    assert 'ix_schedule_doctor_busy' in plan_of(session, statement, parameters)
+
+
+def test_free_between_latency(session, filled):
+    timings = []
+    for _ in range(QUERIES):
+        day = random_day()
+        started = time.monotonic()
+        Schedule.free_between(session, filled.id, day, day + datetime.timedelta(days=1))
+        timings.append(time.monotonic() - started)
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print('\nfree_between: %d rows, p50 %.2f ms, p99 %.2f ms' % (ROWS, p50 * 1000, p99 * 1000))
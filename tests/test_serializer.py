@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('sqlalchemy_utils')
+
+import app.model.doctor  # noqa: F401 регистрация моделей
+import app.model.holiday  # noqa: F401
+import app.model.patient  # noqa: F401
+import app.model.schedule  # noqa: F401
+import app.model.visit  # noqa: F401
+from app.model import Base
+from app.model.base import BaseModel, compile_serializer
+from app.model.visit import FinancingType
+from app.utils import alchemy, encoder
+
+ROWS = 5000
+
+# До компиляции сериализатора даты выводились в to_dict через datetime_to_timestamp
+LEGACY_FIELDS = {
+    'created': alchemy.datetime_to_timestamp,
+    'modified': alchemy.datetime_to_timestamp,
+}
+
+
+# Прежняя реализация BaseModel.to_dict
+def legacy_to_dict(obj, fields):
+    intersection = set(obj.__table__.columns.keys()) & set(fields)
+    return dict(map(
+        lambda key:
+        (key,
+         (lambda value: fields[key](value) if value else obj.isNone(value))
+         (getattr(obj, key))),
+        intersection))
+
+
+def legacy_fields(cls):
+    fields = dict(cls.FIELDS)
+    fields.update(LEGACY_FIELDS)
+    return fields
+
+
+# Модели, использующие to_dict по умолчанию
+def serialized_models():
+    models = [cls for cls in Base._decl_class_registry.values()
+              if isinstance(cls, type) and hasattr(cls, '__table__') and cls.to_dict is BaseModel.to_dict]
+    return sorted(models, key=lambda cls: cls.__name__)
+
+
+def sample(column, variant):
+    if variant == 'none':
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    empty = variant == 'empty'
+    if python_type is bool:
+        return not empty
+    if python_type is int:
+        return 0 if empty else 42
+    if python_type is str:
+        return '' if empty else 'Иванов'
+    if python_type is datetime.datetime:
+        return datetime.datetime(2019, 4, 18, 10, 20)
+    if python_type is datetime.date:
+        return datetime.date(2019, 4, 18)
+    if python_type is datetime.time:
+        return datetime.time(10, 20)
+    if python_type is dict:
+        return {} if empty else {'ключ': 1}
+    if python_type is list:
+        return [] if empty else [datetime.date(2019, 4, 18)]
+    return None
+
+
+def instance(cls, variant):
+    obj = cls.__mapper__.class_manager.new_instance()
+    for column in cls.__table__.columns:
+        setattr(obj, column.key, sample(column, variant))
+    return obj
+
+
+def encoded(data):
+    return json.loads(encoder.dumps(data).decode('utf-8'))
+
+
+@pytest.mark.parametrize('variant', ['none', 'empty', 'filled'])
+def test_compiled_serializer_matches_legacy_to_dict(variant):
+    models = serialized_models()
+    assert models
+    for cls in models:
+        obj = instance(cls, variant)
+        assert encoded(obj.to_dict()) == encoded(legacy_to_dict(obj, legacy_fields(cls))), cls.__name__
+        assert cls.to_dict_list([obj]) == [obj.to_dict()]
+
+
+# Пустые значения: None -> '', 0 и False -> строка, как в BaseModel.isNone; значение ChoiceType - через конвертер
+def test_compiled_serializer_converters():
+    class Row(object):
+        FIELDS = {
+            'id': int,
+            'name': str,
+            'blocked': bool,
+            'created': alchemy.passby,
+            'financing': lambda choice: choice.label,
+        }
+        __table__ = SimpleNamespace(columns=SimpleNamespace(keys=lambda: list(Row.FIELDS)))
+        isNone = BaseModel.isNone
+
+    keys = tuple(Row.FIELDS)
+    serialize = compile_serializer(Row, keys)
+    created = datetime.datetime(2019, 4, 18, 10, 20)
+    for values in ((None, None, None, None, None), (0, '', False, None, None),
+                   (7, 'Иванов', True, created, FinancingType.dms)):
+        row = Row()
+        for key, value in zip(keys, values):
+            setattr(row, key, value)
+        fields = dict(Row.FIELDS, created=alchemy.datetime_to_timestamp)
+        assert encoded(serialize(row)) == encoded(legacy_to_dict(row, fields))
+    assert serialize(row)['financing'] == 'ДМС'
+    assert compile_serializer(Row, ('id',))(row) == {'id': 7}
+    assert compile_serializer(Row, ())(row) == {}
+
+
+# Строк в секунду: скомпилированный сериализатор и прежний to_dict
+def test_serializer_benchmark():
+    print()
+    for cls in serialized_models():
+        rows = [instance(cls, 'filled') for _ in range(ROWS)]
+        fields = legacy_fields(cls)
+
+        started = time.monotonic()
+        for row in rows:
+            legacy_to_dict(row, fields)
+        legacy = time.monotonic() - started
+
+        started = time.monotonic()
+        cls.to_dict_list(rows)
+        compiled = time.monotonic() - started
+
+        assert compiled < legacy, cls.__name__
+        print('%-20s legacy %9.0f rows/s, compiled %9.0f rows/s (x%.1f)' %
+              (cls.__name__, ROWS / legacy, ROWS / compiled, legacy / compiled))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import datetime
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+import falcon
+from falcon import testing
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.middleware import DatabaseSessionManager
+from app.model import User
+
+TOUCH_SQL = text('UPDATE "user" SET modified = :modified WHERE id = :id')
+MODIFIED = datetime.datetime(2030, 1, 1)
+
+
+# Ресурс изменяет пользователя и сообщает, выполнилось ли изменение
+class TouchResource(object):
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    def touch(self, req, res):
+        try:
+            req.context['session'].execute(TOUCH_SQL, {'modified': MODIFIED, 'id': self.user_id})
+            res.media = {'error': None}
+        except DBAPIError as ex:
+            req.context['session'].rollback()
+            res.media = {'error': str(ex.orig)}
+
+    on_get = touch
+    on_post = touch
+
+
+# Приложение только с менеджером сессий приложения (db_session настроен при импорте app.main)
+@pytest.fixture
+def touch_client(client, user):
+    from app.database import db_session
+    app = falcon.API(middleware=[DatabaseSessionManager(db_session)])
+    app.add_route('/touch', TouchResource(user.id))
+    return testing.TestClient(app)
+
+
+def modified(session, user):
+    session.expire_all()
+    return session.query(User.modified).filter(User.id == user.id).scalar()
+
+
+# Запись внутри GET отклоняется базой: транзакция GET открыта только на чтение
+def test_write_inside_get_fails(touch_client, session, user):
+    result = touch_client.simulate_get('/touch')
+    assert result.status_code == 200
+    assert 'read-only transaction' in result.json['error']
+    assert result.headers['X-DB-Commits'] == '0'
+    assert modified(session, user) != MODIFIED
+
+
+# Изменение в POST фиксируется менеджером один раз
+def test_write_inside_post_is_committed(touch_client, session, user):
+    result = touch_client.simulate_post('/touch')
+    assert result.json['error'] is None
+    assert result.headers['X-DB-Commits'] == '1'
+    # Без SET TRANSACTION READ ONLY: UPDATE и COMMIT
+    assert result.headers['X-DB-Round-Trips'] == '2'
+    assert modified(session, user) == MODIFIED
+
+
+# Заголовки приложения: чтение без фиксации, создание правила - одна фиксация
+def test_headers_on_application_requests(client, headers, doctor):
+    result = client.simulate_get('/v1/schedules/jobs/0', headers=headers)
+    assert result.status_code == 204
+    assert result.headers['X-DB-Commits'] == '0'
+    assert int(result.headers['X-DB-Round-Trips']) >= 2
+
+    body = {'doctor': doctor.id, 'period': False, 'date_one': '06.05.2030', 'startTime': '09:00',
+            'endTime': '10:00', 'interval': 15, 'workdays': ['MO']}
+    result = client.simulate_post('/v1/schedules', headers=headers, body=json.dumps(body))
+    assert result.status_code == 200, result.text
+    assert result.headers['X-DB-Commits'] == '1'
+    assert int(result.headers['X-DB-Round-Trips']) >= 3
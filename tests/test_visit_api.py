@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import datetime
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from app.model.schedule import Schedule
+from app.model.visit import Visit
+
+DAY = datetime.datetime(2030, 3, 4)
+
+
+def timestamp_ms(date):
+    return int(time.mktime(date.timetuple()) * 1000)
+
+
+# Запись без источника финансирования: визит сохраняется, календарь за день отдается без ошибок
+def test_book_without_funding_source(client, headers, session, doctor):
+    slot = Schedule(doctor_id=doctor.id, is_busy=False, date_start=DAY + datetime.timedelta(hours=9),
+                    date_end=DAY + datetime.timedelta(hours=9, minutes=15))
+    session.add(slot)
+    session.commit()
+
+    result = client.simulate_post('/v1/visits', headers=headers, body=json.dumps({
+        'last_name': 'Безполисов', 'first_name': 'Тест', 'middle_name': 'Тестович',
+        'mobile': '+79020000001', 'schedule_id': slot.id, 'doctor_id': doctor.id,
+    }))
+    assert result.status_code == 200, result.text
+    visit_id = int(result.json['data']['id'])
+    assert session.query(Visit.source_of_financing).filter(Visit.id == visit_id).scalar() is None
+
+    params = 'date_start=%d&date_end=%d' % (timestamp_ms(DAY), timestamp_ms(DAY + datetime.timedelta(days=1)))
+    result = client.simulate_get('/v1/visits', headers=headers, query_string=params)
+    assert result.status_code == 200, result.text
+    items = [item for item in result.json['data']['items'] if item['id'] == visit_id]
+    assert len(items) == 1
+    assert 'Безполисов' in items[0]['title']
+
+    result = client.simulate_get('/v1/visits', headers=headers, query_string=params + '&stream=true')
+    assert result.status_code == 200
+    assert visit_id in [item['id'] for item in json.loads(result.text)['data']['items']]
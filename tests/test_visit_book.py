@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import datetime
+import threading
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy.orm import Session
+
+from app.model.schedule import Schedule, ScheduleDay
+from app.model.visit import Visit
+
+THREADS = 16
+SLOTS_PER_THREAD = 25
+# Все интервалы теста умещаются в один день: сводка schedule_day одна
+SLOT_MINUTES = 2
+DAY = datetime.datetime(2030, 1, 14)
+
+
+def patient(n):
+    return {'last_name': 'Тестов', 'first_name': 'Тест', 'middle_name': str(n), 'mobile': '+7900%07d' % n}
+
+
+# Интервалы врача на день DAY и сводка schedule_day по ним
+def add_slots(session, doctor, count):
+    slots = [Schedule(doctor_id=doctor.id, is_busy=False,
+                      date_start=DAY + datetime.timedelta(minutes=SLOT_MINUTES * i),
+                      date_end=DAY + datetime.timedelta(minutes=SLOT_MINUTES * (i + 1))) for i in range(count)]
+    session.add_all(slots)
+    session.add(ScheduleDay(doctor_id=doctor.id, day=DAY.date(), free=count))
+    session.commit()
+    return [slot.id for slot in slots]
+
+
+# Каждый поток записывает пациентов на свои интервалы в отдельной сессии; старт по барьеру
+def run_threads(engine, doctor, jobs):
+    creator_id = doctor.user_id
+    barrier = threading.Barrier(len(jobs))
+    results = [[] for _ in jobs]
+    errors = []
+
+    def worker(n, schedule_ids):
+        session = Session(bind=engine)
+        try:
+            barrier.wait()
+            for schedule_id in schedule_ids:
+                results[n].append(Visit.book(session, schedule_id, patient(n), creator_id))
+                session.commit()
+        except Exception as ex:
+            errors.append(ex)
+            session.rollback()
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(n, schedule_ids)) for n, schedule_ids in enumerate(jobs)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    assert not errors, errors
+    return [result for thread_results in results for result in thread_results], elapsed
+
+
+def free_on_day(session, doctor):
+    return session.query(ScheduleDay.free).filter(ScheduleDay.doctor_id == doctor.id,
+                                                  ScheduleDay.day == DAY.date()).scalar()
+
+
+# Одновременная запись на один интервал: ровно одна запись, счетчик уменьшается один раз
+def test_book_same_slot_concurrently(engine, session, doctor):
+    schedule_id, = add_slots(session, doctor, 1)
+
+    results, elapsed = run_threads(engine, doctor, [[schedule_id]] * THREADS)
+
+    booked = [visit_id for visit_id in results if visit_id is not None]
+    assert len(booked) == 1
+    assert results.count(None) == THREADS - 1
+    assert session.query(Visit).filter(Visit.schedule_id == schedule_id).count() == 1
+    assert session.query(Schedule.is_busy).filter(Schedule.id == schedule_id).scalar()
+    assert free_on_day(session, doctor) == 0
+    print('\nbook same slot: %d threads, %.3f s, %.0f attempts/s' % (THREADS, elapsed, THREADS / elapsed))
+
+
+# Пропускная способность записи на разные интервалы
+def test_book_throughput(engine, session, doctor):
+    total = THREADS * SLOTS_PER_THREAD
+    schedule_ids = add_slots(session, doctor, total)
+    jobs = [schedule_ids[n::THREADS] for n in range(THREADS)]
+
+    results, elapsed = run_threads(engine, doctor, jobs)
+
+    assert None not in results
+    assert len(set(results)) == total
+    assert session.query(Visit).filter(Visit.doctor_id == doctor.id).count() == total
+    assert free_on_day(session, doctor) == 0
+    print('\nbook distinct slots: %d threads, %d visits, %.3f s, %.0f visits/s' %
+          (THREADS, total, elapsed, total / elapsed))
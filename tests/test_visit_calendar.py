@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import os
+import datetime
+from contextlib import contextmanager
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import event
+
+from app.model.schedule import Schedule
+from app.model.visit import Visit, FinancingType
+
+VISITS = 20
+ONE_DAY = datetime.datetime(2030, 2, 4)
+MANY_DAY = datetime.datetime(2030, 2, 5)
+
+
+# Записанные визиты врача на день, по одному на интервал в 15 минут
+def add_visits(session, doctor, day, count):
+    slots = [Schedule(doctor_id=doctor.id, is_busy=False,
+                      date_start=day + datetime.timedelta(minutes=15 * i),
+                      date_end=day + datetime.timedelta(minutes=15 * (i + 1))) for i in range(count)]
+    session.add_all(slots)
+    session.flush()
+    for i, slot in enumerate(slots):
+        patient = {'last_name': 'Календарев', 'first_name': 'Тест', 'middle_name': str(i),
+                   'mobile': '+7901%07d' % i}
+        assert Visit.book(session, slot.id, patient, doctor.user_id,
+                          source_of_financing=FinancingType.oms.value) is not None
+    session.commit()
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def calendar(session, day):
+    rows = Visit.calendar_query(session, day, day + datetime.timedelta(days=1)).all()
+    return [Visit.calendar_item(row) for row in rows]
+
+
+# Календарь строится одним запросом независимо от числа визитов (без N+1 по связям)
+def test_calendar_query_statement_count(engine, session, doctor):
+    add_visits(session, doctor, ONE_DAY, 1)
+    add_visits(session, doctor, MANY_DAY, VISITS)
+
+    with count_statements(engine) as one:
+        assert len(calendar(session, ONE_DAY)) == 1
+    with count_statements(engine) as many:
+        assert len(calendar(session, MANY_DAY)) == VISITS
+
+    assert len(one) == len(many)